@@ -43,6 +43,15 @@ setup(
             "flake8>=6.0",
             "mypy>=1.0",
         ],
+        "compression": [
+            "zstandard>=0.22",
+        ],
+        "ann": [
+            "hnswlib>=0.8",
+        ],
+        "fast-json": [
+            "orjson>=3.8",
+        ],
     },
     entry_points={
         "console_scripts": [
@@ -4,10 +4,11 @@ MCP (Model Context Protocol) server management with built-in registry.
 
 import json
 import os
-from typing import Optional, Dict, List, Any
+import time
+from typing import Optional, Dict, List, Any, Set
 from dataclasses import dataclass, field
-from datetime import datetime
 from .mcp_registry import MCPRegistry, MCPServerTemplate
+from .persistence import write_json
 
 
 @dataclass
@@ -20,7 +21,7 @@ class MCPServer:
     env: Dict[str, str] = field(default_factory=dict)
     disabled: bool = False
     auto_approve: List[str] = field(default_factory=list)
-    created_at: datetime = field(default_factory=datetime.now)
+    created_at: float = field(default_factory=time.time)
     source: str = "custom"  # custom or registry
 
     def to_dict(self) -> Dict[str, Any]:
@@ -41,8 +42,29 @@ class MCPManager:
         self.config_dir = os.path.expanduser(config_dir)
         self.config_file = os.path.join(self.config_dir, "mcp.json")
         self.servers: Dict[str, MCPServer] = {}
+        # Names of enabled servers and of servers per source, kept in step
+        # with self.servers by every mutator
+        self._enabled: Set[str] = set()
+        self._by_source: Dict[str, Set[str]] = {}
         self.registry = MCPRegistry()
+        os.makedirs(self.config_dir, exist_ok=True)
         self._load_config()
+        for server in self.servers.values():
+            self._track(server)
+
+    def _track(self, server: MCPServer):
+        """Add a server to the enabled/source indexes."""
+        if not server.disabled:
+            self._enabled.add(server.name)
+        self._by_source.setdefault(server.source, set()).add(server.name)
+
+    def _untrack(self, name: str):
+        """Remove a server from the enabled/source indexes."""
+        server = self.servers.get(name)
+        if server is None:
+            return
+        self._enabled.discard(name)
+        self._by_source.get(server.source, set()).discard(name)
 
     def _load_config(self):
         """Load MCP configuration from file."""
@@ -67,8 +89,6 @@ class MCPManager:
 
     def _save_config(self):
         """Save MCP configuration to file."""
-        os.makedirs(self.config_dir, exist_ok=True)
-
         try:
             data = {
                 "mcpServers": {
@@ -76,8 +96,7 @@ class MCPManager:
                     for name, server in self.servers.items()
                 }
             }
-            with open(self.config_file, "w") as f:
-                json.dump(data, f, indent=2)
+            write_json(self.config_file, data)
         except Exception as e:
             print(f"❌ Failed to save MCP config: {e}")
 
@@ -109,7 +128,9 @@ class MCPManager:
             source="registry",
         )
 
+        self._untrack(name)
         self.servers[name] = server
+        self._track(server)
         self._save_config()
 
         print(f"✅ Added MCP server '{name}' from registry")
@@ -132,13 +153,16 @@ class MCPManager:
             auto_approve=auto_approve or [],
             source="custom",
         )
+        self._untrack(name)
         self.servers[name] = server
+        self._track(server)
         self._save_config()
         return server
 
     def remove_server(self, name: str) -> bool:
         """Remove MCP server."""
         if name in self.servers:
+            self._untrack(name)
             del self.servers[name]
             self._save_config()
             return True
@@ -148,6 +172,7 @@ class MCPManager:
         """Enable MCP server."""
         if name in self.servers:
             self.servers[name].disabled = False
+            self._enabled.add(name)
             self._save_config()
             return True
         return False
@@ -156,6 +181,7 @@ class MCPManager:
         """Disable MCP server."""
         if name in self.servers:
             self.servers[name].disabled = True
+            self._enabled.discard(name)
             self._save_config()
             return True
         return False
@@ -170,7 +196,8 @@ class MCPManager:
 
     def list_enabled_servers(self) -> List[MCPServer]:
         """List enabled MCP servers."""
-        return [s for s in self.servers.values() if not s.disabled]
+        # Walk servers rather than the set so results keep config order
+        return [s for name, s in self.servers.items() if name in self._enabled]
 
     def list_registry_servers(self) -> List[MCPServerTemplate]:
         """List available servers in registry."""
@@ -194,14 +221,10 @@ class MCPManager:
 
         return {
             "installed_servers": len(self.servers),
-            "enabled_servers": len(self.list_enabled_servers()),
-            "disabled_servers": len([s for s in self.servers.values() if s.disabled]),
-            "from_registry": len(
-                [s for s in self.servers.values() if s.source == "registry"]
-            ),
-            "custom_servers": len(
-                [s for s in self.servers.values() if s.source == "custom"]
-            ),
+            "enabled_servers": len(self._enabled),
+            "disabled_servers": len(self.servers) - len(self._enabled),
+            "from_registry": len(self._by_source.get("registry", ())),
+            "custom_servers": len(self._by_source.get("custom", ())),
             "registry_available": registry_stats["total_servers"],
             "registry_categories": len(registry_stats["categories"]),
             "servers": [s.name for s in self.servers.values()],
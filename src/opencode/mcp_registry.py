@@ -6,6 +6,15 @@ from typing import Dict, List, Any, Optional
 from dataclasses import dataclass
 import json
 import os
+from .persistence import write_json
+
+
+def _trigram_bloom(text: str) -> int:
+    """Hash the 3-grams of text into a 256-bit bitmap packed as an int."""
+    bloom = 0
+    for trigram in map("".join, zip(text, text[1:], text[2:])):
+        bloom |= 1 << (hash(trigram) & 255)
+    return bloom
 
 
 @dataclass
@@ -44,12 +53,17 @@ class MCPRegistry:
         self.storage_dir = os.path.expanduser(storage_dir)
         self.registry_file = os.path.join(self.storage_dir, "registry.json")
         self.servers: Dict[str, MCPServerTemplate] = {}
+        # Lowercased search text and trigram bitmaps, keyed by template name
+        self._haystacks: Dict[str, str] = {}
+        self._blooms: Dict[str, int] = {}
+        os.makedirs(self.storage_dir, exist_ok=True)
         self._load()
 
     def register(self, server: MCPServerTemplate) -> bool:
         """Register MCP server template."""
         try:
             self.servers[server.name] = server
+            self._index(server)
             self._save()
             return True
         except Exception as e:
@@ -60,6 +74,8 @@ class MCPRegistry:
         """Unregister MCP server template."""
         if name in self.servers:
             del self.servers[name]
+            self._haystacks.pop(name, None)
+            self._blooms.pop(name, None)
             self._save()
             return True
         return False
@@ -81,13 +97,30 @@ class MCPRegistry:
         return list(set(s.category for s in self.servers.values()))
 
     def search(self, query: str) -> List[MCPServerTemplate]:
-        """Search servers by name or description."""
-        query_lower = query.lower()
-        return [
-            s
-            for s in self.servers.values()
-            if query_lower in s.name.lower() or query_lower in s.description.lower()
-        ]
+        """Search servers by name or description.
+
+        Whitespace-separated terms must all match, so "gith api" finds
+        templates mentioning both "gith" and "api".
+        """
+        terms = list(dict.fromkeys(query.lower().split())) or [query.lower()]
+        query_bloom = 0
+        for term in terms:
+            query_bloom |= _trigram_bloom(term)
+
+        results = []
+        for name, bloom in self._blooms.items():
+            if (bloom & query_bloom) != query_bloom:
+                continue
+            haystack = self._haystacks[name]
+            if all(term in haystack for term in terms):
+                results.append(self.servers[name])
+        return results
+
+    def _index(self, server: MCPServerTemplate):
+        """Rebuild the search text and bitmap for a template."""
+        haystack = server.name.lower() + "\n" + server.description.lower()
+        self._haystacks[server.name] = haystack
+        self._blooms[server.name] = _trigram_bloom(haystack)
 
     def import_template(self, template_dict: Dict[str, Any]) -> bool:
         """Import server template from dictionary."""
@@ -131,16 +164,12 @@ class MCPRegistry:
 
     def _save(self):
         """Save registry to disk."""
-        os.makedirs(self.storage_dir, exist_ok=True)
-
         data = {
-            "templates": {
-                name: server.to_dict() for name, server in self.servers.items()
-            }
+            "version": 2,
+            "templates": [server.to_dict() for server in self.servers.values()],
         }
 
-        with open(self.registry_file, "w") as f:
-            json.dump(data, f, indent=2)
+        write_json(self.registry_file, data)
 
     def _load(self):
         """Load registry from disk."""
@@ -151,7 +180,12 @@ class MCPRegistry:
             with open(self.registry_file, "r") as f:
                 data = json.load(f)
 
-            for name, template_dict in data.get("templates", {}).items():
+            templates = data.get("templates", [])
+            if isinstance(templates, dict):
+                # Version 1 files keyed templates by name
+                templates = templates.values()
+
+            for template_dict in templates:
                 server = MCPServerTemplate(
                     name=template_dict["name"],
                     description=template_dict["description"],
@@ -163,7 +197,8 @@ class MCPRegistry:
                     api_key_env=template_dict.get("api_key_env", ""),
                     auto_approve=template_dict.get("auto_approve"),
                 )
-                self.servers[name] = server
+                self.servers[server.name] = server
+                self._index(server)
         except Exception as e:
             print(f"⚠️  Failed to load registry: {e}")
 
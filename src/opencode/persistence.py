@@ -0,0 +1,19 @@
+"""
+JSON file helpers shared by the OpenCode managers.
+"""
+
+import json
+import os
+from typing import Any
+
+
+def write_json(path: str, data: Any):
+    """Write data as indented JSON, recreating the directory if it is gone."""
+    try:
+        f = open(path, "w")
+    except FileNotFoundError:
+        # Directory was removed after startup
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        f = open(path, "w")
+    with f:
+        json.dump(data, f, indent=2)
@@ -2,11 +2,14 @@
 OpenCode session management.
 """
 
+import functools
 import json
 import os
+import time
 from typing import Optional, Dict, List, Any
 from dataclasses import dataclass, field
 from datetime import datetime
+from .persistence import write_json
 
 
 @dataclass
@@ -16,8 +19,8 @@ class SessionInfo:
     session_id: str
     name: str
     model: str
-    created_at: datetime = field(default_factory=datetime.now)
-    updated_at: datetime = field(default_factory=datetime.now)
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
     messages: int = 0
     tokens_used: int = 0
     metadata: Dict[str, Any] = field(default_factory=dict)
@@ -28,28 +31,38 @@ class SessionInfo:
             "session_id": self.session_id,
             "name": self.name,
             "model": self.model,
-            "created_at": self.created_at.isoformat(),
-            "updated_at": self.updated_at.isoformat(),
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
             "messages": self.messages,
             "tokens_used": self.tokens_used,
             "metadata": self.metadata,
         }
 
 
+@functools.lru_cache(maxsize=4096)
+def _parse_iso(value: str) -> float:
+    """Parse an ISO timestamp string into POSIX seconds."""
+    return datetime.fromisoformat(value).timestamp()
+
+
+def _parse_timestamp(value: Any) -> float:
+    """Read a stored timestamp, accepting ISO strings from older session files."""
+    if isinstance(value, str):
+        return _parse_iso(value)
+    return float(value)
+
+
 class SessionManager:
     """Manage OpenCode sessions."""
 
     def __init__(self, sessions_dir: str = "~/.opencode/sessions"):
         self.sessions_dir = os.path.expanduser(sessions_dir)
         self.sessions: Dict[str, SessionInfo] = {}
+        os.makedirs(self.sessions_dir, exist_ok=True)
         self._load_sessions()
 
     def _load_sessions(self):
         """Load sessions from disk."""
-        if not os.path.exists(self.sessions_dir):
-            os.makedirs(self.sessions_dir, exist_ok=True)
-            return
-
         try:
             for filename in os.listdir(self.sessions_dir):
                 if filename.endswith(".json"):
@@ -60,8 +73,8 @@ class SessionManager:
                             session_id=data["session_id"],
                             name=data["name"],
                             model=data["model"],
-                            created_at=datetime.fromisoformat(data["created_at"]),
-                            updated_at=datetime.fromisoformat(data["updated_at"]),
+                            created_at=_parse_timestamp(data["created_at"]),
+                            updated_at=_parse_timestamp(data["updated_at"]),
                             messages=data.get("messages", 0),
                             tokens_used=data.get("tokens_used", 0),
                             metadata=data.get("metadata", {}),
@@ -72,12 +85,9 @@ class SessionManager:
 
     def _save_session(self, session: SessionInfo):
         """Save session to disk."""
-        os.makedirs(self.sessions_dir, exist_ok=True)
-
         try:
             filepath = os.path.join(self.sessions_dir, f"{session.session_id}.json")
-            with open(filepath, "w") as f:
-                json.dump(session.to_dict(), f, indent=2)
+            write_json(filepath, session.to_dict())
         except Exception as e:
             print(f"❌ Failed to save session: {e}")
 
@@ -119,7 +129,7 @@ class SessionManager:
         if metadata is not None:
             session.metadata.update(metadata)
 
-        session.updated_at = datetime.now()
+        session.updated_at = time.time()
         self._save_session(session)
         return session
 
@@ -129,8 +139,9 @@ class SessionManager:
             del self.sessions[session_id]
             filepath = os.path.join(self.sessions_dir, f"{session_id}.json")
             try:
-                if os.path.exists(filepath):
-                    os.remove(filepath)
+                os.remove(filepath)
+            except FileNotFoundError:
+                pass
             except Exception as e:
                 print(f"⚠️  Failed to delete session file: {e}")
             return True
@@ -2,9 +2,100 @@
 Advanced RLM Optimizer - Next-level token optimization.
 """
 
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Deque, Dict, Any, Optional, Tuple
+import heapq
 import re
+import time
 from datetime import datetime
+from collections import deque
+from itertools import groupby, islice
+from operator import itemgetter
+
+
+def _phrase_pattern(phrases) -> str:
+    """
+    Build a regex alternation matching any of the given phrases.
+
+    Phrases are factored by common prefix (a trie), so the regex engine
+    rejects most positions after a single character instead of trying
+    every phrase in turn.
+    """
+    trie: Dict[str, Any] = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[""] = {}  # end of phrase
+
+    def build(node: Dict[str, Any]) -> str:
+        branches = [
+            re.escape(char) + build(child)
+            for char, child in sorted(node.items())
+            if char
+        ]
+        if not branches:
+            return ""
+        if "" in node:
+            # A phrase ends here; longer phrases continue optionally
+            return "(?:" + "|".join(branches) + ")?"
+        if len(branches) == 1:
+            return branches[0]
+        return "(?:" + "|".join(branches) + ")"
+
+    return build(trie)
+
+
+# Prompts shorter than this (with no context) are returned unchanged; the
+# passes below cannot save enough on them to pay for themselves
+_MIN_OPTIMIZE_LENGTH = 80
+
+# Redundant phrases and their replacements, keyed by lowercased phrase
+_REDUNDANT_MAP = {
+    "please": "",
+    "kindly": "",
+    "could you": "",
+    "can you": "",
+    "would you": "",
+    "i would like to": "",
+    "i want to": "",
+    "in order to": "to ",
+    "due to the fact that": "because ",
+    "at this point in time": "now ",
+}
+_REDUNDANT_RE = re.compile(
+    r"\b(" + _phrase_pattern(_REDUNDANT_MAP) + r")\s+", re.IGNORECASE
+)
+
+# Verbose to concise mappings, keyed by lowercased phrase
+_VERBOSE_MAP = {
+    "a large number of": "many",
+    "a majority of": "most",
+    "a small number of": "few",
+    "at the present time": "now",
+    "in the event that": "if",
+    "in spite of the fact that": "although",
+    "on the occasion of": "when",
+    "with regard to": "about",
+    "for the purpose of": "to",
+    "in the near future": "soon",
+    "prior to": "before",
+    "subsequent to": "after",
+    "in the process of": "during",
+    "make a decision": "decide",
+    "come to a conclusion": "conclude",
+    "give consideration to": "consider",
+}
+_VERBOSE_RE = re.compile(r"\b(" + _phrase_pattern(_VERBOSE_MAP) + r")\b", re.IGNORECASE)
+
+# Filler words, matched only as whole whitespace-separated words
+_FILLERS_RE = re.compile(
+    r"(?<!\S)(actually|basically|literally|really|very|quite|rather|somewhat)(?!\S)",
+    re.IGNORECASE,
+)
+_WHITESPACE_RE = re.compile(r"\s+")
+_POLITE_RE = re.compile(r"\b(please|kindly)\b", re.IGNORECASE)
+_AGGRESSIVE_RE = re.compile(r"\b(a|an|the|please|kindly|could you)\b", re.IGNORECASE)
+_PUNCT_TABLE = str.maketrans("", "", ",;:")
 
 
 class AdvancedOptimizer:
@@ -20,8 +111,14 @@ class AdvancedOptimizer:
     """
 
     def __init__(self):
-        self.optimization_history: List[Dict] = []
+        # Most recent optimizations; the oldest drops off automatically
+        self.optimization_history: Deque[Dict] = deque(maxlen=100)
         self.learned_patterns: Dict[str, Any] = {}
+        # Running total of savings_pct over optimization_history
+        self._savings_sum = 0.0
+        # Compiled matcher for learned_patterns and the patterns it was built from
+        self._patterns_re: Optional[re.Pattern] = None
+        self._patterns_source: Dict[str, Any] = {}
 
     def optimize_prompt_advanced(
         self,
@@ -43,6 +140,19 @@ class AdvancedOptimizer:
             Optimized prompt with metadata
         """
         original_length = len(prompt)
+        if original_length < _MIN_OPTIMIZE_LENGTH and not context:
+            return {
+                "original_prompt": prompt,
+                "optimized_prompt": prompt,
+                "context": context,
+                "original_length": original_length,
+                "optimized_length": original_length,
+                "savings_percent": "0.0%",
+                "savings_pct": 0.0,
+                "strategies_used": [],
+                "estimated_tokens_saved": 0,
+            }
+
         optimized = prompt
         strategies_used = []
 
@@ -85,6 +195,7 @@ class AdvancedOptimizer:
             "original_length": original_length,
             "optimized_length": final_length,
             "savings_percent": f"{savings_percent:.1f}%",
+            "savings_pct": savings_percent,
             "strategies_used": strategies_used,
             "estimated_tokens_saved": int((original_length - final_length) / 4),
         }
@@ -98,31 +209,13 @@ class AdvancedOptimizer:
         """Remove redundant phrases and repetitions."""
         original_length = len(text)
 
-        # Remove repeated words
-        words = text.split()
-        seen = set()
-        filtered = []
-
-        for word in words:
-            word_lower = word.lower()
-            if word_lower not in seen or len(word) <= 3:
-                filtered.append(word)
-                seen.add(word_lower)
-
-        text = " ".join(filtered)
+        # Collapse immediately repeated words ("the the"), comparing against
+        # one lowercased copy of the text rather than lowering word by word
+        words = zip(text.split(), text.lower().split())
+        text = " ".join(next(run)[0] for _, run in groupby(words, key=itemgetter(1)))
 
         # Remove redundant phrases
-        redundant_phrases = [
-            (r"\b(please|kindly)\s+", ""),
-            (r"\b(could you|can you|would you)\s+", ""),
-            (r"\b(I would like to|I want to)\s+", ""),
-            (r"\b(in order to)\s+", "to "),
-            (r"\b(due to the fact that)\s+", "because "),
-            (r"\b(at this point in time)\s+", "now "),
-        ]
-
-        for pattern, replacement in redundant_phrases:
-            text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
+        text = _REDUNDANT_RE.sub(lambda m: _REDUNDANT_MAP[m.group(1).lower()], text)
 
         removed = original_length - len(text)
         return text, removed
@@ -131,104 +224,73 @@ class AdvancedOptimizer:
         """Compress verbose expressions."""
         original_length = len(text)
 
-        # Verbose to concise mappings
-        compressions = {
-            r"\b(a large number of)\b": "many",
-            r"\b(a majority of)\b": "most",
-            r"\b(a small number of)\b": "few",
-            r"\b(at the present time)\b": "now",
-            r"\b(in the event that)\b": "if",
-            r"\b(in spite of the fact that)\b": "although",
-            r"\b(on the occasion of)\b": "when",
-            r"\b(with regard to)\b": "about",
-            r"\b(for the purpose of)\b": "to",
-            r"\b(in the near future)\b": "soon",
-            r"\b(prior to)\b": "before",
-            r"\b(subsequent to)\b": "after",
-            r"\b(in the process of)\b": "during",
-            r"\b(make a decision)\b": "decide",
-            r"\b(come to a conclusion)\b": "conclude",
-            r"\b(give consideration to)\b": "consider",
-        }
-
-        for pattern, replacement in compressions.items():
-            text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
+        text = _VERBOSE_RE.sub(lambda m: _VERBOSE_MAP[m.group(1).lower()], text)
 
         compressed = original_length - len(text)
         return text, compressed
 
     def _merge_context_smart(self, prompt: str, context: str) -> Tuple[str, str]:
         """Intelligently merge context with prompt."""
-        # Extract key information from context
-        context_lines = context.split("\n")
-
-        # Prioritize context by relevance
-        prompt_words = set(prompt.lower().split())
-        scored_lines = []
-
-        for line in context_lines:
-            if not line.strip():
-                continue
-
-            line_words = set(line.lower().split())
-            relevance = len(prompt_words & line_words)
-
-            if relevance > 0:
-                scored_lines.append((relevance, line))
+        # Score each context line by how many prompt words it shares
+        prompt_words = frozenset(prompt.lower().split())
+        scored_lines = (
+            (len(prompt_words.intersection(line.lower().split())), line)
+            for line in context.split("\n")
+        )
 
-        # Sort by relevance and take top items
-        scored_lines.sort(key=lambda x: x[0], reverse=True)
-        relevant_context = "\n".join([line for _, line in scored_lines[:3]])
+        # Take the most relevant lines without sorting the whole context
+        top_lines = heapq.nlargest(
+            3, (item for item in scored_lines if item[0] > 0), key=itemgetter(0)
+        )
+        relevant_context = "\n".join(line for _, line in top_lines)
 
         return prompt, relevant_context
 
     def _rewrite_for_clarity(self, text: str) -> str:
         """Rewrite for maximum clarity with minimum tokens."""
         # Remove filler words
-        fillers = [
-            "actually",
-            "basically",
-            "literally",
-            "really",
-            "very",
-            "quite",
-            "rather",
-            "somewhat",
-        ]
-
-        words = text.split()
-        filtered = [w for w in words if w.lower() not in fillers]
-
-        text = " ".join(filtered)
+        text = _FILLERS_RE.sub("", text)
 
         # Clean up extra whitespace
-        text = re.sub(r"\s+", " ", text)
+        text = _WHITESPACE_RE.sub(" ", text)
         text = text.strip()
 
         return text
 
     def _apply_learned_patterns(self, text: str) -> str:
         """Apply patterns learned from previous optimizations."""
-        # Apply learned substitutions
-        for pattern, replacement in self.learned_patterns.items():
-            if pattern in text.lower():
-                text = text.replace(pattern, replacement)
+        if not self.learned_patterns:
+            return text
 
-        return text
+        # Rebuild the combined matcher only when the patterns change
+        if self._patterns_source != self.learned_patterns:
+            self._patterns_source = dict(self.learned_patterns)
+            patterns = [p for p in self._patterns_source if p]
+            self._patterns_re = (
+                re.compile(_phrase_pattern(patterns)) if patterns else None
+            )
+
+        if self._patterns_re is None:
+            return text
+
+        # Apply all learned substitutions in a single pass
+        replacements = self._patterns_source
+        return self._patterns_re.sub(lambda m: replacements[m.group(0)], text)
 
     def _learn_from_optimization(self, result: Dict[str, Any]):
         """Learn patterns from successful optimizations."""
-        self.optimization_history.append(
+        history = self.optimization_history
+        if len(history) == history.maxlen:
+            self._savings_sum -= history[0]["savings_pct"]
+
+        history.append(
             {
-                "timestamp": datetime.now().isoformat(),
-                "savings_percent": result["savings_percent"],
+                "timestamp": time.time(),
+                "savings_pct": result["savings_pct"],
                 "strategies": result["strategies_used"],
             }
         )
-
-        # Keep only recent history
-        if len(self.optimization_history) > 100:
-            self.optimization_history = self.optimization_history[-100:]
+        self._savings_sum += result["savings_pct"]
 
     def get_optimization_stats(self) -> Dict[str, Any]:
         """Get optimization statistics."""
@@ -236,22 +298,19 @@ class AdvancedOptimizer:
             return {"total_optimizations": 0, "avg_savings": "0%"}
 
         total = len(self.optimization_history)
-
-        # Calculate average savings
-        savings = []
-        for opt in self.optimization_history:
-            try:
-                percent = float(opt["savings_percent"].rstrip("%"))
-                savings.append(percent)
-            except Exception:
-                continue
-
-        avg_savings = sum(savings) / len(savings) if savings else 0
+        avg_savings = self._savings_sum / total
 
         return {
             "total_optimizations": total,
             "avg_savings": f"{avg_savings:.1f}%",
-            "recent_optimizations": self.optimization_history[-5:],
+            "recent_optimizations": [
+                {
+                    "timestamp": datetime.fromtimestamp(opt["timestamp"]).isoformat(),
+                    "savings_percent": f"{opt['savings_pct']:.1f}%",
+                    "strategies": opt["strategies"],
+                }
+                for opt in islice(self.optimization_history, max(total - 5, 0), None)
+            ],
         }
 
 
@@ -261,10 +320,11 @@ class AdaptiveCompressor:
     """
 
     def __init__(self):
-        self.compression_stats: Dict[str, List[float]] = {
-            "minimal": [],
-            "smart": [],
-            "aggressive": [],
+        # Per strategy: (uses, sum of compression ratios)
+        self.compression_stats: Dict[str, Tuple[int, float]] = {
+            "minimal": (0, 0.0),
+            "smart": (0, 0.0),
+            "aggressive": (0, 0.0),
         }
 
     def compress_adaptive(self, text: str, context: str = "") -> Tuple[str, str]:
@@ -299,32 +359,30 @@ class AdaptiveCompressor:
 
         # Record performance
         compression_ratio = len(compressed) / length if length > 0 else 1.0
-        self.compression_stats[strategy].append(compression_ratio)
+        uses, ratio_sum = self.compression_stats[strategy]
+        self.compression_stats[strategy] = (uses + 1, ratio_sum + compression_ratio)
 
         return compressed, strategy
 
     def _estimate_complexity(self, text: str) -> float:
         """Estimate text complexity (0-1)."""
-        # Simple heuristic
-        unique_words = len(set(text.lower().split()))
-        total_words = len(text.split())
+        # Simple heuristic: share of distinct words
+        words = text.lower().split()
+        total_words = len(words)
 
         if total_words == 0:
             return 0.0
 
-        complexity = unique_words / total_words
+        complexity = len(set(words)) / total_words
         return min(complexity, 1.0)
 
     def _get_best_strategy(self) -> str:
         """Get best performing strategy."""
-        if not any(self.compression_stats.values()):
-            return "smart"
-
         # Calculate average compression ratio for each strategy
         averages = {}
-        for strategy, ratios in self.compression_stats.items():
-            if ratios:
-                averages[strategy] = sum(ratios) / len(ratios)
+        for strategy, (uses, ratio_sum) in self.compression_stats.items():
+            if uses:
+                averages[strategy] = ratio_sum / uses
 
         if not averages:
             return "smart"
@@ -334,32 +392,31 @@ class AdaptiveCompressor:
 
     def _compress_minimal(self, text: str) -> str:
         """Minimal compression."""
-        return re.sub(r"\s+", " ", text).strip()
+        return _WHITESPACE_RE.sub(" ", text).strip()
 
     def _compress_smart(self, text: str) -> str:
         """Smart compression."""
-        text = re.sub(r"\s+", " ", text)
-        text = re.sub(r"\b(please|kindly)\b", "", text, flags=re.IGNORECASE)
+        text = _WHITESPACE_RE.sub(" ", text)
+        text = _POLITE_RE.sub("", text)
         return text.strip()
 
     def _compress_aggressive(self, text: str) -> str:
         """Aggressive compression."""
-        text = re.sub(r"\s+", " ", text)
-        text = re.sub(r"\b(a|an|the)\b", "", text, flags=re.IGNORECASE)
-        text = re.sub(r"\b(please|kindly|could you)\b", "", text, flags=re.IGNORECASE)
-        text = re.sub(r"[,;:]", "", text)
+        text = _WHITESPACE_RE.sub(" ", text)
+        text = _AGGRESSIVE_RE.sub("", text)
+        text = text.translate(_PUNCT_TABLE)
         return text.strip()
 
     def get_stats(self) -> Dict[str, Any]:
         """Get compression statistics."""
         stats = {}
 
-        for strategy, ratios in self.compression_stats.items():
-            if ratios:
-                avg_ratio = sum(ratios) / len(ratios)
+        for strategy, (uses, ratio_sum) in self.compression_stats.items():
+            if uses:
+                avg_ratio = ratio_sum / uses
                 avg_savings = (1 - avg_ratio) * 100
                 stats[strategy] = {
-                    "uses": len(ratios),
+                    "uses": uses,
                     "avg_compression": f"{avg_savings:.1f}%",
                 }
             else:
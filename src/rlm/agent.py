@@ -42,6 +42,18 @@ class RLMEnabledLLMAgent(LLMAgent):
         self.total_tokens_saved = 0
         self.total_requests = 0
 
+        # Provider labels reported to the RLM on every request
+        self._provider_name = (
+            self.llm_provider.__class__.__name__.lower().replace("provider", "")
+            if self.llm_provider
+            else ""
+        )
+        self._model_name = (
+            getattr(self.llm_provider, "model", "unknown")
+            if self.llm_provider
+            else "unknown"
+        )
+
         if self.rlm:
             self._initialize_rlm_context()
 
@@ -78,14 +90,12 @@ class RLMEnabledLLMAgent(LLMAgent):
             }
 
         # Process with EnterpriseRLM (checks memory, applies advanced optimization)
-        full_prompt = f"{system_prompt}\n\n{prompt}" if system_prompt else prompt
+        full_prompt = "\n\n".join(filter(None, (system_prompt, prompt)))
 
         optimization = self.rlm.process_query(
             full_prompt,
-            provider=self.llm_provider.__class__.__name__.lower().replace(
-                "provider", ""
-            ),
-            model=getattr(self.llm_provider, "model", "unknown"),
+            provider=self._provider_name,
+            model=self._model_name,
             use_intelligence=True,
             validate_response=True,
             use_advanced_optimization=True,
@@ -109,7 +119,7 @@ class RLMEnabledLLMAgent(LLMAgent):
             context = optimization.get("context_enhanced", "")
 
             if context:
-                optimized_prompt += f"\n\nRelevant Context:\n{context}"
+                optimized_prompt = f"{optimized_prompt}\n\nRelevant Context:\n{context}"
 
             response = self.llm_provider.generate(optimized_prompt, system_prompt)
 
@@ -119,10 +129,8 @@ class RLMEnabledLLMAgent(LLMAgent):
                 query=full_prompt,
                 response=response,
                 context=context,
-                provider=self.llm_provider.__class__.__name__.lower().replace(
-                    "provider", ""
-                ),
-                model=getattr(self.llm_provider, "model", "unknown"),
+                provider=self._provider_name,
+                model=self._model_name,
                 tokens_used=optimization.get("estimated_tokens", 0),
                 success=True,
                 validate=True,
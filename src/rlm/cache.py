@@ -2,14 +2,34 @@
 RLM cache for storing and retrieving cached responses.
 """
 
+import base64
+import functools
 import json
 import hashlib
 import os
+import zlib
+from collections import OrderedDict
 from typing import Optional, Dict, Any
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from datetime import datetime
 
 
+# Responses shorter than this are stored as-is; compressing and base64
+# encoding them costs more than it saves
+_COMPRESS_THRESHOLD = 512
+
+
+@functools.lru_cache(maxsize=4096)
+def _query_hash(query: str) -> str:
+    """Hash a query, memoized so a get/set round trip hashes it once."""
+    return hashlib.blake2b(query.encode(), digest_size=16).hexdigest()
+
+
+def _encode_record(record: Dict[str, Any]) -> str:
+    """Encode a log record as one compact JSON line."""
+    return json.dumps(record, separators=(",", ":")) + "\n"
+
+
 @dataclass
 class CachedResponse:
     """Cached LLM response."""
@@ -20,6 +40,10 @@ class CachedResponse:
     tokens_saved: int
     timestamp: datetime = field(default_factory=datetime.now)
     metadata: Dict[str, Any] = field(default_factory=dict)
+    compressed: bool = False
+    _decompressed: Optional[str] = field(
+        default=None, init=False, repr=False, compare=False
+    )
 
 
 class RLMCache:
@@ -33,61 +57,110 @@ class RLMCache:
         enable_compression: bool = True,
     ):
         self.cache_dir = cache_dir
-        self.cache: Dict[str, CachedResponse] = {}
+        # Ordered from least to most recently used
+        self.cache: OrderedDict[str, CachedResponse] = OrderedDict()
         self.max_size = max_size
         self.ttl_hours = ttl_hours
         self.enable_compression = enable_compression
-        self.access_order = []  # For LRU
+        self.log_file = os.path.join(cache_dir, "cache.jsonl")
+        self._log_records = 0
         self._load_cache()
 
     def _get_query_hash(self, query: str) -> str:
         """Generate hash for query."""
-        return hashlib.sha256(query.encode()).hexdigest()
+        return _query_hash(query)
 
     def _load_cache(self):
-        """Load cache from disk."""
+        """Load cache from disk by replaying the append-only log."""
         if not os.path.exists(self.cache_dir):
             os.makedirs(self.cache_dir)
 
-        cache_file = os.path.join(self.cache_dir, "cache.json")
-        if os.path.exists(cache_file):
+        legacy_file = os.path.join(self.cache_dir, "cache.json")
+        if os.path.exists(legacy_file):
+            try:
+                with open(legacy_file, "r") as f:
+                    for key, value in json.load(f).items():
+                        self.cache[key] = self._entry_from_dict(value)
+            except Exception as e:
+                print(f"⚠️  Failed to load cache: {e}")
+
+        if os.path.exists(self.log_file):
             try:
-                with open(cache_file, "r") as f:
-                    data = json.load(f)
-                    for key, value in data.items():
-                        timestamp = value.get("timestamp")
-                        if isinstance(timestamp, str):
-                            try:
-                                timestamp = datetime.fromisoformat(timestamp)
-                            except Exception:
-                                timestamp = datetime.now()
-                        self.cache[key] = CachedResponse(
-                            query_hash=value["query_hash"],
-                            query=value["query"],
-                            response=value["response"],
-                            tokens_saved=value.get("tokens_saved", 0),
-                            timestamp=timestamp,
-                            metadata=value.get("metadata", {}),
-                        )
+                with open(self.log_file, "r") as f:
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        record = json.loads(line)
+                        if record["op"] == "set":
+                            self.cache[record["key"]] = self._entry_from_dict(record)
+                        else:
+                            self.cache.pop(record["key"], None)
+                        self._log_records += 1
             except Exception as e:
                 print(f"⚠️  Failed to load cache: {e}")
 
-    def _save_cache(self):
-        """Save cache to disk."""
-        cache_file = os.path.join(self.cache_dir, "cache.json")
+        if os.path.exists(legacy_file):
+            # Migrate the old snapshot format into the log
+            self._compact()
+            os.remove(legacy_file)
+
+    def _entry_from_dict(self, value: Dict[str, Any]) -> CachedResponse:
+        """Build a cache entry from its serialized form."""
+        timestamp = value.get("timestamp")
+        if isinstance(timestamp, str):
+            try:
+                timestamp = datetime.fromisoformat(timestamp)
+            except Exception:
+                timestamp = datetime.now()
+        return CachedResponse(
+            query_hash=value["query_hash"],
+            query=value["query"],
+            response=value["response"],
+            tokens_saved=value.get("tokens_saved", 0),
+            timestamp=timestamp,
+            metadata=value.get("metadata", {}),
+            # Entries written before the flag existed were always compressed
+            # when compression was enabled
+            compressed=value.get("compressed", self.enable_compression),
+        )
+
+    def _entry_to_dict(self, key: str, response: CachedResponse) -> Dict[str, Any]:
+        """Serialize a cache entry as a log record."""
+        return {
+            "op": "set",
+            "key": key,
+            "query_hash": response.query_hash,
+            "query": response.query,
+            "response": response.response,
+            "tokens_saved": response.tokens_saved,
+            "timestamp": response.timestamp.isoformat(),
+            "metadata": response.metadata,
+            "compressed": response.compressed,
+        }
+
+    def _append(self, *records: Dict[str, Any]):
+        """Append records to the log, compacting once it outgrows the cache."""
         try:
-            data = {}
-            for key, response in self.cache.items():
-                data[key] = {
-                    "query_hash": response.query_hash,
-                    "query": response.query,
-                    "response": response.response,
-                    "tokens_saved": response.tokens_saved,
-                    "timestamp": response.timestamp.isoformat(),
-                    "metadata": response.metadata,
-                }
-            with open(cache_file, "w") as f:
-                json.dump(data, f, indent=2)
+            with open(self.log_file, "a") as f:
+                for record in records:
+                    f.write(_encode_record(record))
+            self._log_records += len(records)
+        except Exception as e:
+            print(f"⚠️  Failed to save cache: {e}")
+            return
+
+        if self._log_records > 2 * max(len(self.cache), 1):
+            self._compact()
+
+    def _compact(self):
+        """Rewrite the log as one set record per live entry."""
+        tmp_file = self.log_file + ".tmp"
+        try:
+            with open(tmp_file, "w") as f:
+                for key, response in self.cache.items():
+                    f.write(_encode_record(self._entry_to_dict(key, response)))
+            os.replace(tmp_file, self.log_file)
+            self._log_records = len(self.cache)
         except Exception as e:
             print(f"⚠️  Failed to save cache: {e}")
 
@@ -100,27 +173,31 @@ class RLMCache:
             # Check TTL
             if self._is_expired(cached):
                 del self.cache[query_hash]
-                self._save_cache()
+                self._append({"op": "del", "key": query_hash})
                 return None
 
             # Update LRU
-            if query_hash in self.access_order:
-                self.access_order.remove(query_hash)
-            self.access_order.append(query_hash)
+            self.cache.move_to_end(query_hash)
 
-            if self.enable_compression:
-                cached.response = self._decompress(cached.response)
+            if cached.compressed:
+                # Keep the stored entry compressed; decompress once and hand
+                # callers a plain-text copy
+                if cached._decompressed is None:
+                    cached._decompressed = self._decompress(cached.response)
+                return replace(cached, response=cached._decompressed, compressed=False)
 
             return cached
 
         return None
 
-    def _is_expired(self, cached: CachedResponse) -> bool:
+    def _is_expired(
+        self, cached: CachedResponse, now: Optional[datetime] = None
+    ) -> bool:
         """Check if cache entry is expired."""
         if self.ttl_hours <= 0:
             return False
 
-        age_hours = (datetime.now() - cached.timestamp).total_seconds() / 3600
+        age_hours = ((now or datetime.now()) - cached.timestamp).total_seconds() / 3600
         return age_hours > self.ttl_hours
 
     def set(
@@ -134,11 +211,15 @@ class RLMCache:
         query_hash = self._get_query_hash(query)
 
         # Check size limit
-        if len(self.cache) >= self.max_size:
-            self._evict_lru()
-
-        # Compress response if enabled
-        if self.enable_compression:
+        records = []
+        if query_hash not in self.cache and len(self.cache) >= self.max_size:
+            evicted = self._evict_lru()
+            if evicted:
+                records.append({"op": "del", "key": evicted})
+
+        # Compress response if enabled and long enough to benefit
+        compressed = self.enable_compression and len(response) > _COMPRESS_THRESHOLD
+        if compressed:
             response = self._compress(response)
 
         cached = CachedResponse(
@@ -147,38 +228,34 @@ class RLMCache:
             response=response,
             tokens_saved=tokens_saved,
             metadata=metadata or {},
+            compressed=compressed,
         )
         self.cache[query_hash] = cached
 
         # Update LRU
-        if query_hash in self.access_order:
-            self.access_order.remove(query_hash)
-        self.access_order.append(query_hash)
+        self.cache.move_to_end(query_hash)
 
-        self._save_cache()
+        records.append(self._entry_to_dict(query_hash, cached))
+        self._append(*records)
 
-    def _evict_lru(self):
-        """Evict least recently used entry."""
-        if self.access_order:
-            lru_hash = self.access_order.pop(0)
-            if lru_hash in self.cache:
-                del self.cache[lru_hash]
+    def _evict_lru(self) -> Optional[str]:
+        """Evict least recently used entry and return its hash."""
+        if self.cache:
+            lru_hash, _ = self.cache.popitem(last=False)
+            return lru_hash
+        return None
 
     def _compress(self, text: str) -> str:
         """Compress text for storage."""
-        import zlib
-        import base64
-
-        compressed = zlib.compress(text.encode())
-        return base64.b64encode(compressed).decode()
+        # Level 1 keeps compression cheap on the write path; decompression
+        # cost is about the same at every level
+        compressed = zlib.compress(text.encode(), 1)
+        return base64.b64encode(compressed).decode("ascii")
 
     def _decompress(self, text: str) -> str:
         """Decompress text from storage."""
         try:
-            import zlib
-            import base64
-
-            compressed = base64.b64decode(text.encode())
+            compressed = base64.b64decode(text)
             return zlib.decompress(compressed).decode()
         except Exception:
             return text  # Return as-is if not compressed
@@ -186,16 +263,15 @@ class RLMCache:
     def get_stats(self) -> Dict[str, Any]:
         """Get comprehensive cache statistics."""
         total_tokens_saved = sum(r.tokens_saved for r in self.cache.values())
-        cache_file = os.path.join(self.cache_dir, "cache.json")
         cache_size = 0
-        if os.path.exists(cache_file):
-            cache_size = os.path.getsize(cache_file) / (1024 * 1024)
+        if os.path.exists(self.log_file):
+            cache_size = os.path.getsize(self.log_file) / (1024 * 1024)
 
         # Calculate average age
         if self.cache:
+            now = datetime.now()
             ages = [
-                (datetime.now() - r.timestamp).total_seconds() / 3600
-                for r in self.cache.values()
+                (now - r.timestamp).total_seconds() / 3600 for r in self.cache.values()
             ]
             avg_age = sum(ages) / len(ages)
         else:
@@ -215,20 +291,18 @@ class RLMCache:
     def clear(self):
         """Clear all cache."""
         self.cache.clear()
-        self.access_order.clear()
-        self._save_cache()
+        self._compact()
 
     def prune_expired(self):
         """Remove expired entries."""
+        now = datetime.now()
         expired = [
-            hash for hash, cached in self.cache.items() if self._is_expired(cached)
+            hash for hash, cached in self.cache.items() if self._is_expired(cached, now)
         ]
         for hash in expired:
             del self.cache[hash]
-            if hash in self.access_order:
-                self.access_order.remove(hash)
 
         if expired:
-            self._save_cache()
+            self._append(*({"op": "del", "key": hash} for hash in expired))
 
         return len(expired)
@@ -2,11 +2,105 @@
 RLM (Retrieval-based Language Model) engine for token optimization.
 """
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from datetime import datetime
+import functools
+import heapq
 import re
+import threading
+import numpy as np
 from .cache import RLMCache
 
+_WS_RE = re.compile(r"\s+")
+# Whitespace runs (group 1) collapse to a space; articles and ,;: are dropped
+_AGGRESSIVE_RE = re.compile(r"(\s+)|\b(?:a|an|the)\b|[,;:]", re.IGNORECASE)
+_POLITE_RE = re.compile(r"\b(please|kindly|could you)\b", re.IGNORECASE)
+
+
+def _normalize(vector) -> np.ndarray:
+    """Return a float32 unit-length copy of an embedding."""
+    vector = np.array(vector, dtype=np.float32)
+    vector /= np.linalg.norm(vector) + 1e-12
+    return vector
+
+
+_ST_MODEL_LOCK = threading.Lock()
+
+
+@functools.lru_cache(maxsize=1)
+def _load_st_model(name: str):
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(name)
+
+
+def _get_st_model(name: str = "all-MiniLM-L6-v2"):
+    """
+    Return the process-wide SentenceTransformer, loading it on first use.
+
+    Raises ImportError when sentence-transformers is not installed.
+    """
+    with _ST_MODEL_LOCK:
+        return _load_st_model(name)
+
+
+def _ensure_capacity(array: np.ndarray, size: int) -> np.ndarray:
+    """Return array, or a copy with doubled rows, so it holds size rows."""
+    if size <= len(array):
+        return array
+    grown = np.empty((max(size, 2 * len(array)),) + array.shape[1:], array.dtype)
+    grown[: len(array)] = array
+    return grown
+
+
+def _token_bloom(tokens) -> int:
+    """64-bit bloom mask of a token set; disjoint masks mean no shared token."""
+    mask = 0
+    for token in tokens:
+        mask |= 1 << (hash(token) & 63)
+    return mask
+
+
+@functools.lru_cache(maxsize=256)
+def _encode_query(model, text: str) -> np.ndarray:
+    """
+    Embed a query string, memoized per model.
+
+    A single request is embedded by both the vector store and the context
+    retriever; this makes the second encode a lookup. The returned array is
+    shared, so it is marked read-only.
+    """
+    vector = np.asarray(model.encode(text))
+    vector.setflags(write=False)
+    return vector
+
+
+@functools.lru_cache(maxsize=1)
+def _tiktoken_encoding():
+    """Load the cl100k_base encoding once, or None without tiktoken."""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    return tiktoken.get_encoding("cl100k_base")
+
+
+@functools.lru_cache(maxsize=4096)
+def _count_tokens_cached(text: str, method: str) -> int:
+    """Token count for a string; prompts are recounted often, so memoize."""
+    if method == "tiktoken":
+        enc = _tiktoken_encoding()
+        if enc is not None:
+            return len(enc.encode(text))
+        method = "accurate"
+
+    if method == "accurate":
+        # Better estimation: count words and adjust
+        words = len(text.split())
+        return int(words * 1.3)  # ~1.3 tokens per word
+    else:  # fast
+        return len(text) // 4
+
 
 class TokenCounter:
     """Advanced token counter with multiple strategies."""
@@ -21,21 +115,7 @@ class TokenCounter:
         - fast: Quick estimation (1 token ≈ 4 chars)
         - tiktoken: Use tiktoken library if available
         """
-        if method == "tiktoken":
-            try:
-                import tiktoken
-
-                enc = tiktoken.get_encoding("cl100k_base")
-                return len(enc.encode(text))
-            except ImportError:
-                method = "accurate"
-
-        if method == "accurate":
-            # Better estimation: count words and adjust
-            words = len(text.split())
-            return int(words * 1.3)  # ~1.3 tokens per word
-        else:  # fast
-            return len(text) // 4
+        return _count_tokens_cached(text, method)
 
     @staticmethod
     def count_prompt_tokens(prompt: str, system_prompt: str = "") -> int:
@@ -54,37 +134,117 @@ class TokenCounter:
 class ContextRetriever:
     """Advanced context retrieval with semantic search."""
 
-    def __init__(self, max_context_length: int = 2000):
+    def __init__(self, max_context_length: int = 2000, max_items: int = 10000):
         self.max_context_length = max_context_length
+        # Retrieval scans every item, so the store is capped; least used go first
+        self.max_items = max_items
         self.memory_store: List[Dict[str, Any]] = []
+        # Columns parallel to memory_store for the scoring loops: lowercase
+        # token sets with their bloom masks, and access counts (grown
+        # geometrically)
+        self._token_sets: List[frozenset] = []
+        self._token_blooms: List[int] = []
+        self._access_counts = np.zeros(16, dtype=np.int64)
+        # L2-normalized embeddings stacked row-wise (grown geometrically), plus
+        # the memory_store index each row belongs to
+        self._emb_matrix: Optional[np.ndarray] = None
+        self._emb_rows: List[int] = []
         self.use_embeddings = False
         self._init_embeddings()
 
     def _init_embeddings(self):
         """Initialize embeddings if available."""
         try:
-            from sentence_transformers import SentenceTransformer
-
-            self.embeddings_model = SentenceTransformer("all-MiniLM-L6-v2")
+            self.embeddings_model = _get_st_model()
             self.use_embeddings = True
         except ImportError:
             self.use_embeddings = False
 
     def add_to_memory(self, key: str, content: str, metadata: Dict = None):
         """Add content to memory with optional embedding."""
-        item = {
-            "key": key,
-            "content": content,
-            "metadata": metadata or {},
-            "timestamp": datetime.now().isoformat(),
-            "access_count": 0,
-            "last_accessed": None,
-        }
+        self.add_many([{"key": key, "content": content, "metadata": metadata}])
+
+    def add_many(self, items: List[Dict[str, Any]]):
+        """
+        Add several {"key", "content", "metadata"} items to memory.
 
-        if self.use_embeddings:
-            item["embedding"] = self.embeddings_model.encode(content)
+        Embeddings for the whole batch are computed in one encode call.
+        """
+        now = datetime.now().isoformat()
+        new_items = [
+            {
+                "key": entry["key"],
+                "content": entry["content"],
+                "metadata": entry.get("metadata") or {},
+                "timestamp": now,
+                "access_count": 0,
+                "last_accessed": None,
+            }
+            for entry in items
+        ]
+
+        if self.use_embeddings and new_items:
+            embeddings = self.embeddings_model.encode(
+                [item["content"] for item in new_items],
+                batch_size=32,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+            )
+            for row, embedding in enumerate(embeddings, start=len(self.memory_store)):
+                # Stored unit-length so similarity is a plain dot product; the
+                # matrix row is the only copy
+                self._append_embedding(_normalize(embedding), row)
+
+        # Tokenized once here so keyword scoring is set lookups only
+        token_sets = [frozenset(item["content"].lower().split()) for item in new_items]
+        self._token_sets.extend(token_sets)
+        self._token_blooms.extend(map(_token_bloom, token_sets))
+        count = len(self.memory_store)
+        new_count = count + len(new_items)
+        self._access_counts = _ensure_capacity(self._access_counts, new_count)
+        self._access_counts[count:new_count] = 0
+
+        self.memory_store.extend(new_items)
+        while len(self.memory_store) > self.max_items:
+            self._evict(self._least_used_row())
+
+    def _least_used_row(self) -> int:
+        """Row with the fewest accesses, oldest access breaking ties."""
+        store = self.memory_store
+        access_counts = self._access_counts[: len(store)]
+        candidates = np.flatnonzero(access_counts == access_counts.min())
+        return int(
+            min(
+                candidates,
+                key=lambda i: store[i]["last_accessed"] or store[i]["timestamp"],
+            )
+        )
 
-        self.memory_store.append(item)
+    def _evict(self, row: int):
+        """Remove a row by moving the last row into its place."""
+        last = len(self.memory_store) - 1
+        self.memory_store[row] = self.memory_store[last]
+        self._token_sets[row] = self._token_sets[last]
+        self._token_blooms[row] = self._token_blooms[last]
+        self._access_counts[row] = self._access_counts[last]
+        self.memory_store.pop()
+        self._token_sets.pop()
+        self._token_blooms.pop()
+
+        if self._emb_rows:
+            # Every item is embedded, so matrix row i belongs to memory row i
+            self._emb_matrix[row] = self._emb_matrix[last]
+            self._emb_rows.pop()
+
+    def _append_embedding(self, embedding, row: int):
+        """Append a normalized embedding to the stacked matrix."""
+        count = len(self._emb_rows)
+        if self._emb_matrix is None:
+            self._emb_matrix = np.empty((16, embedding.shape[0]), dtype=np.float32)
+        self._emb_matrix = _ensure_capacity(self._emb_matrix, count + 1)
+
+        self._emb_matrix[count] = embedding
+        self._emb_rows.append(row)
 
     def retrieve_relevant_context(
         self, query: str, top_k: int = 3, strategy: str = "hybrid"
@@ -115,92 +275,109 @@ class ContextRetriever:
 
     def _retrieve_keyword(self, query: str, top_k: int) -> str:
         """Keyword-based retrieval."""
-        query_words = set(query.lower().split())
-        scored_items = []
-
-        for item in self.memory_store:
-            content_words = set(item["content"].lower().split())
-            score = len(query_words & content_words)
-            if score > 0:
-                scored_items.append((score, item))
+        scores = np.fromiter(
+            self._keyword_overlaps(query), dtype=np.int32, count=len(self._token_sets)
+        )
 
-        scored_items.sort(key=lambda x: x[0], reverse=True)
-        return self._format_context(scored_items[:top_k])
+        return self._format_context(
+            [i for i in self._top_indices(scores, top_k) if scores[i] > 0]
+        )
 
     def _retrieve_semantic(self, query: str, top_k: int) -> str:
         """Semantic similarity-based retrieval."""
-        query_embedding = self.embeddings_model.encode(query)
-        scored_items = []
-
-        for item in self.memory_store:
-            if "embedding" in item:
-                similarity = self._cosine_similarity(query_embedding, item["embedding"])
-                scored_items.append((similarity, item))
-
-        scored_items.sort(key=lambda x: x[0], reverse=True)
-        return self._format_context(scored_items[:top_k])
+        similarities = self._semantic_scores(query)
+        return self._format_context(
+            [self._emb_rows[i] for i in self._top_indices(similarities, top_k)]
+        )
 
     def _retrieve_hybrid(self, query: str, top_k: int) -> str:
         """Hybrid retrieval combining keyword and semantic."""
         query_words = set(query.lower().split())
-        query_embedding = self.embeddings_model.encode(query)
-        scored_items = []
-
-        for item in self.memory_store:
-            # Keyword score
-            content_words = set(item["content"].lower().split())
-            keyword_score = len(query_words & content_words) / max(len(query_words), 1)
-
-            # Semantic score
-            semantic_score = 0
-            if "embedding" in item:
-                semantic_score = self._cosine_similarity(
-                    query_embedding, item["embedding"]
-                )
+        keyword_scores = np.fromiter(
+            self._keyword_overlaps(query),
+            dtype=np.float32,
+            count=len(self._token_sets),
+        )
+
+        # Combined score (weighted), accumulated in place: 0.4 * kw + 0.6 * sem
+        combined_scores = keyword_scores
+        combined_scores *= 0.4 / max(len(query_words), 1)
+        semantic_scores = self._semantic_scores(query)
+        semantic_scores *= 0.6
+        if len(semantic_scores) == len(combined_scores):
+            # Every item is embedded, so matrix rows line up with memory_store
+            combined_scores += semantic_scores
+        else:
+            combined_scores[self._emb_rows] += semantic_scores
+        return self._format_context(self._top_indices(combined_scores, top_k))
+
+    def _keyword_overlaps(self, query: str):
+        """Yield the number of query words each item contains, in row order."""
+        query_words = frozenset(query.lower().split())
+        query_bloom = _token_bloom(query_words)
+        for tokens, bloom in zip(self._token_sets, self._token_blooms):
+            # Disjoint bloom masks rule out any overlap without touching the set
+            yield len(query_words & tokens) if query_bloom & bloom else 0
+
+    def _semantic_scores(self, query: str) -> np.ndarray:
+        """
+        Cosine similarity of the query against every stored embedding.
 
-            # Combined score (weighted)
-            combined_score = 0.4 * keyword_score + 0.6 * semantic_score
-            scored_items.append((combined_score, item))
+        Rows are unit-length, so this is one BLAS GEMV over the matrix; its
+        thread count follows OMP_NUM_THREADS (or the BLAS-specific variable).
+        """
+        query_vector = _normalize(_encode_query(self.embeddings_model, query))
+        if not self._emb_rows:
+            return np.zeros(0, dtype=np.float32)
 
-        scored_items.sort(key=lambda x: x[0], reverse=True)
-        return self._format_context(scored_items[:top_k])
+        return self._emb_matrix[: len(self._emb_rows)] @ query_vector
+
+    @staticmethod
+    def _top_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+        """Indices of the top_k highest scores, best first (ties oldest first)."""
+        if top_k < len(scores):
+            # argpartition picks tied rows arbitrarily, so take every row tied
+            # with the cutoff score, then keep the oldest in row order
+            cutoff = -np.partition(-scores, top_k - 1)[top_k - 1]
+            candidates = np.flatnonzero(scores >= cutoff)
+            order = np.argsort(-scores[candidates], kind="stable")
+            return candidates[order[:top_k]]
+        return np.argsort(-scores, kind="stable")
 
     def _retrieve_by_frequency(self, top_k: int) -> str:
         """Retrieve most frequently accessed items."""
-        sorted_items = sorted(
-            self.memory_store, key=lambda x: x["access_count"], reverse=True
-        )
-        return self._format_context([(0, item) for item in sorted_items[:top_k]])
+        access_counts = self._access_counts[: len(self.memory_store)]
+        return self._format_context(self._top_indices(access_counts, top_k))
 
     def _retrieve_recent(self, top_k: int) -> str:
         """Retrieve most recently accessed items."""
-        sorted_items = sorted(
-            self.memory_store,
-            key=lambda x: x.get("last_accessed") or x["timestamp"],
-            reverse=True,
+        store = self.memory_store
+        top_rows = heapq.nlargest(
+            top_k,
+            range(len(store)),
+            key=lambda i: store[i]["last_accessed"] or store[i]["timestamp"],
         )
-        return self._format_context([(0, item) for item in sorted_items[:top_k]])
-
-    def _format_context(self, scored_items: List) -> str:
-        """Format context from scored items."""
-        context = ""
-        for score, item in scored_items:
+        return self._format_context(top_rows)
+
+    def _format_context(self, rows) -> str:
+        """Format context from memory_store rows, best first."""
+        parts = []
+        total_length = 0
+        now = datetime.now().isoformat()
+        for row in rows:
             # Update access stats
+            item = self.memory_store[row]
+            self._access_counts[row] += 1
             item["access_count"] += 1
-            item["last_accessed"] = datetime.now().isoformat()
+            item["last_accessed"] = now
 
-            context += f"\n[Context] {item['key']}:\n{item['content']}\n"
-            if len(context) > self.max_context_length:
+            part = f"\n[Context] {item['key']}:\n{item['content']}\n"
+            parts.append(part)
+            total_length += len(part)
+            if total_length > self.max_context_length:
                 break
 
-        return context[: self.max_context_length]
-
-    @staticmethod
-    def _cosine_similarity(a, b):
-        """Calculate cosine similarity."""
-        import numpy as np
-
-        return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
+        return "".join(parts)[: self.max_context_length]
 
 
 class PromptCompressor:
@@ -218,17 +395,13 @@ class PromptCompressor:
         """
         if strategy == "aggressive":
             # Remove extra whitespace, articles, etc.
-            text = re.sub(r"\s+", " ", text)
-            text = re.sub(r"\b(a|an|the)\b", "", text, flags=re.IGNORECASE)
-            text = re.sub(r"[,;:]", "", text)
+            text = _AGGRESSIVE_RE.sub(lambda m: " " if m.group(1) else "", text)
         elif strategy == "smart":
             # Remove extra whitespace and redundant phrases
-            text = re.sub(r"\s+", " ", text)
-            text = re.sub(
-                r"\b(please|kindly|could you)\b", "", text, flags=re.IGNORECASE
-            )
+            text = _WS_RE.sub(" ", text)
+            text = _POLITE_RE.sub("", text)
         else:  # minimal
-            text = re.sub(r"\s+", " ", text)
+            text = _WS_RE.sub(" ", text)
 
         return text.strip()
 
@@ -271,43 +444,72 @@ class RLMOptimizer:
     ) -> Dict[str, Any]:
         """Advanced prompt optimization."""
 
+        # 1. Check cache first
+        if use_cache:
+            cached_result = self.lookup_cached(query)
+            if cached_result:
+                return cached_result
+
         self.stats["total_queries"] += 1
+
+        # 2. Compress, add context and deduplicate
+        result = self._optimize_uncached(
+            query, use_context, context_strategy, compression_strategy
+        )
+
+        self.stats["compression_savings"] += max(result["compression_savings"], 0)
+        self.stats["context_savings"] += result["context_savings"]
+        self.stats["total_tokens_saved"] += result["tokens_saved"]
+        return result
+
+    def lookup_cached(self, query: str) -> Optional[Dict[str, Any]]:
+        """Return the optimization result for a cached query, or None on a miss."""
+        cached = self.cache.get(query)
+        if not cached:
+            return None
+
+        self.stats["total_queries"] += 1
+        self.stats["cache_hits"] += 1
+        self.stats["total_tokens_saved"] += cached.tokens_saved
+        return {
+            "optimized_prompt": query,
+            "context": "",
+            "tokens_original": self.token_counter.count_tokens(
+                query, self.token_method
+            ),
+            "tokens_optimized": 0,
+            "tokens_saved": cached.tokens_saved,
+            "from_cache": True,
+            "cached_response": cached.response,
+            "compression_used": False,
+            "context_used": False,
+        }
+
+    def _optimize_uncached(
+        self,
+        query: str,
+        use_context: bool,
+        context_strategy: str,
+        compression_strategy: str,
+    ) -> Dict[str, Any]:
+        """Compress, add context and deduplicate a query that missed the cache."""
         original_query = query
+        original_tokens = self.token_counter.count_tokens(query, self.token_method)
 
-        # 1. Check cache first
-        if use_cache:
-            cached = self.cache.get(query)
-            if cached:
-                self.stats["cache_hits"] += 1
-                self.stats["total_tokens_saved"] += cached.tokens_saved
-                return {
-                    "optimized_prompt": query,
-                    "context": "",
-                    "tokens_original": self.token_counter.count_tokens(
-                        query, self.token_method
-                    ),
-                    "tokens_optimized": 0,
-                    "tokens_saved": cached.tokens_saved,
-                    "from_cache": True,
-                    "cached_response": cached.response,
-                    "compression_used": False,
-                    "context_used": False,
-                }
-
-        # 2. Compress prompt if enabled
+        # 1. Compress prompt if enabled
         compression_savings = 0
         if self.enable_compression:
             compressed = self.compressor.compress(query, compression_strategy)
-            original_tokens = self.token_counter.count_tokens(query, self.token_method)
-            compressed_tokens = self.token_counter.count_tokens(
-                compressed, self.token_method
-            )
-            compression_savings = original_tokens - compressed_tokens
-            if compression_savings > 0:
-                query = compressed
-                self.stats["compression_savings"] += compression_savings
+            # Only tokenize the compressed text if it actually got shorter
+            if len(compressed) < len(query):
+                compressed_tokens = self.token_counter.count_tokens(
+                    compressed, self.token_method
+                )
+                compression_savings = original_tokens - compressed_tokens
+                if compression_savings > 0:
+                    query = compressed
 
-        # 3. Retrieve relevant context
+        # 2. Retrieve relevant context
         context = ""
         context_savings = 0
         if use_context:
@@ -317,16 +519,12 @@ class RLMOptimizer:
             if context:
                 # Context can replace parts of the query
                 context_savings = len(context.split()) // 2
-                self.stats["context_savings"] += context_savings
 
-        # 4. Deduplicate if enabled
+        # 3. Deduplicate if enabled
         if self.enable_deduplication and context:
             query, context = self._deduplicate(query, context)
 
         # Calculate final tokens
-        original_tokens = self.token_counter.count_tokens(
-            original_query, self.token_method
-        )
         optimized_tokens = self.token_counter.count_tokens(
             query + context, self.token_method
         )
@@ -338,7 +536,6 @@ class RLMOptimizer:
             optimized_tokens = original_tokens
 
         tokens_saved = original_tokens - optimized_tokens
-        self.stats["total_tokens_saved"] += tokens_saved
 
         return {
             "optimized_prompt": query,
@@ -357,10 +554,9 @@ class RLMOptimizer:
     def _deduplicate(self, query: str, context: str) -> tuple:
         """Remove duplicate information between query and context."""
         query_words = set(query.lower().split())
-        context_words = context.lower().split()
 
-        # Remove words from context that are in query
-        filtered_context = [w for w in context_words if w.lower() not in query_words]
+        # Remove words from context that are in query, keeping original casing
+        filtered_context = [w for w in context.split() if w.lower() not in query_words]
 
         return query, " ".join(filtered_context)
 
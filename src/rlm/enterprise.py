@@ -4,6 +4,7 @@ Enterprise RLM System - Complete integration of all components.
 
 from typing import Dict, List, Any
 from datetime import datetime
+import time
 from .engine import RLMOptimizer
 from .knowledge_base import KnowledgeBase
 from .vector_store import VectorStore
@@ -129,12 +130,18 @@ class EnterpriseRLM:
 
         for item in common_knowledge:
             self.knowledge.add(**item)
-            if self.vectors.embeddings_model:
-                self.vectors.add(
-                    item["id"],
-                    f"{item['title']}: {item['content']}",
-                    {"category": item["category"], "tags": item["tags"]},
-                )
+
+        if self.vectors.embeddings_model:
+            self.vectors.add_many(
+                [
+                    (
+                        item["id"],
+                        f"{item['title']}: {item['content']}",
+                        {"category": item["category"], "tags": item["tags"]},
+                    )
+                    for item in common_knowledge
+                ]
+            )
 
         print(f"✅ Added {len(common_knowledge)} common knowledge entries")
 
@@ -161,7 +168,7 @@ class EnterpriseRLM:
         8. Remember everything
         9. Learn and improve
         """
-        start_time = datetime.now()
+        start_time = time.perf_counter()
 
         # 1. Check memory for exact match (NO DUPLICATION)
         exact_memory = self.memory.recall_exact(query)
@@ -262,7 +269,7 @@ class EnterpriseRLM:
             "context_enhanced": context,
             "advanced_optimization": advanced_result,
             "compression_strategy": compression_strategy,
-            "processing_time": (datetime.now() - start_time).total_seconds(),
+            "processing_time": time.perf_counter() - start_time,
         }
 
         return result
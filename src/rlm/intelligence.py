@@ -2,23 +2,89 @@
 Enterprise AI Intelligence Layer - learns from usage patterns.
 """
 
-from typing import Dict, List, Any
+from typing import Deque, Dict, List, Any, Tuple
 from datetime import datetime
-from collections import defaultdict
-import json
+from collections import Counter, defaultdict, deque
+import functools
 import os
-
-
-class UsagePattern:
+from .persistence import DeferredSave, read_json, write_json_atomic
+
+# Common words filtered out of keywords
+_STOPWORDS = frozenset(
+    {
+        "the",
+        "a",
+        "an",
+        "and",
+        "or",
+        "but",
+        "in",
+        "on",
+        "at",
+        "to",
+        "for",
+        "of",
+        "with",
+        "by",
+    }
+)
+
+# Categories in priority order with the substrings that select them
+_CATEGORY_KEYWORDS = (
+    ("coding", ("code", "function", "class", "api", "implement")),
+    ("explanation", ("explain", "what", "how", "why")),
+    ("debugging", ("fix", "error", "bug", "issue")),
+    ("design", ("design", "architecture", "structure")),
+    ("testing", ("test", "verify", "check")),
+)
+
+_COMPLEXITY_WORDS = ("complex", "advanced", "detailed", "comprehensive")
+
+
+@functools.lru_cache(maxsize=2048)
+def _extract_keywords(text: str) -> Tuple[str, ...]:
+    """Keywords of a text, memoized since the same queries recur."""
+    # Simple keyword extraction
+    words = text.lower().split()
+    keywords = [w for w in words if len(w) > 3 and w not in _STOPWORDS]
+    return tuple(keywords[:10])  # Top 10
+
+
+@functools.lru_cache(maxsize=4096)
+def _categorize_query(query: str) -> str:
+    """Categorize query by content (memoized; done for analysis and recording)."""
+    query_lower = query.lower()
+
+    for category, words in _CATEGORY_KEYWORDS:
+        if any(word in query_lower for word in words):
+            return category
+    return "general"
+
+
+@functools.lru_cache(maxsize=4096)
+def _estimate_complexity(query: str) -> int:
+    """Estimate query complexity (1-10)."""
+    # Simple heuristic
+    length_score = min(len(query) // 50, 5)
+    question_marks = query.count("?")
+    query_lower = query.lower()
+    complexity_words = sum(1 for word in _COMPLEXITY_WORDS if word in query_lower)
+
+    complexity = length_score + question_marks + complexity_words
+    return min(max(complexity, 1), 10)
+
+
+class UsagePattern(DeferredSave):
     """Track and analyze usage patterns."""
 
     def __init__(self, storage_dir: str = ".rlm_cache/patterns"):
         self.storage_dir = storage_dir
-        self.query_patterns: Dict[str, int] = defaultdict(int)
+        self.query_patterns: Dict[str, int] = Counter()
         self.time_patterns: Dict[int, int] = defaultdict(int)  # hour -> count
         self.provider_usage: Dict[str, int] = defaultdict(int)
         self.model_usage: Dict[str, int] = defaultdict(int)
         self.category_patterns: Dict[str, int] = defaultdict(int)
+        self._init_deferred_save()
         self._load()
 
     def record_query(
@@ -50,34 +116,11 @@ class UsagePattern:
 
     def _extract_keywords(self, text: str) -> List[str]:
         """Extract keywords from text."""
-        # Simple keyword extraction
-        words = text.lower().split()
-        # Filter common words
-        stopwords = {
-            "the",
-            "a",
-            "an",
-            "and",
-            "or",
-            "but",
-            "in",
-            "on",
-            "at",
-            "to",
-            "for",
-            "of",
-            "with",
-            "by",
-        }
-        keywords = [w for w in words if len(w) > 3 and w not in stopwords]
-        return keywords[:10]  # Top 10
+        return list(_extract_keywords(text))
 
     def get_popular_queries(self, top_k: int = 10) -> List[tuple]:
         """Get most popular query patterns."""
-        sorted_patterns = sorted(
-            self.query_patterns.items(), key=lambda x: x[1], reverse=True
-        )
-        return sorted_patterns[:top_k]
+        return self.query_patterns.most_common(top_k)
 
     def get_peak_hours(self) -> List[int]:
         """Get peak usage hours."""
@@ -108,32 +151,30 @@ class UsagePattern:
             "category_distribution": dict(self.category_patterns),
         }
 
-    def _save(self):
+    def _save_now(self):
         """Save patterns to disk."""
         os.makedirs(self.storage_dir, exist_ok=True)
 
+        # Counter and defaultdict serialize as plain dicts and json writes the
+        # int hour keys as strings, so the maps are dumped without copying
         data = {
-            "query_patterns": dict(self.query_patterns),
-            "time_patterns": {str(k): v for k, v in self.time_patterns.items()},
-            "provider_usage": dict(self.provider_usage),
-            "model_usage": dict(self.model_usage),
-            "category_patterns": dict(self.category_patterns),
+            "query_patterns": self.query_patterns,
+            "time_patterns": self.time_patterns,
+            "provider_usage": self.provider_usage,
+            "model_usage": self.model_usage,
+            "category_patterns": self.category_patterns,
         }
 
-        with open(os.path.join(self.storage_dir, "patterns.json"), "w") as f:
-            json.dump(data, f, indent=2)
+        write_json_atomic(os.path.join(self.storage_dir, "patterns.json"), data)
 
     def _load(self):
         """Load patterns from disk."""
-        filepath = os.path.join(self.storage_dir, "patterns.json")
-        if not os.path.exists(filepath):
-            return
-
         try:
-            with open(filepath, "r") as f:
-                data = json.load(f)
+            data = read_json(os.path.join(self.storage_dir, "patterns.json"))
+            if data is None:
+                return
 
-            self.query_patterns = defaultdict(int, data.get("query_patterns", {}))
+            self.query_patterns = Counter(data.get("query_patterns", {}))
             self.time_patterns = defaultdict(
                 int, {int(k): v for k, v in data.get("time_patterns", {}).items()}
             )
@@ -149,7 +190,8 @@ class IntelligenceEngine:
 
     def __init__(self):
         self.usage_patterns = UsagePattern()
-        self.performance_history: List[Dict] = []
+        # Only the last 1000 records are kept
+        self.performance_history: Deque[Dict] = deque(maxlen=1000)
 
     def analyze_query(self, query: str) -> Dict[str, Any]:
         """Analyze query and provide recommendations."""
@@ -184,39 +226,11 @@ class IntelligenceEngine:
 
     def _categorize_query(self, query: str) -> str:
         """Categorize query by content."""
-        query_lower = query.lower()
-
-        if any(
-            word in query_lower
-            for word in ["code", "function", "class", "api", "implement"]
-        ):
-            return "coding"
-        elif any(word in query_lower for word in ["explain", "what", "how", "why"]):
-            return "explanation"
-        elif any(word in query_lower for word in ["fix", "error", "bug", "issue"]):
-            return "debugging"
-        elif any(
-            word in query_lower for word in ["design", "architecture", "structure"]
-        ):
-            return "design"
-        elif any(word in query_lower for word in ["test", "verify", "check"]):
-            return "testing"
-        else:
-            return "general"
+        return _categorize_query(query)
 
     def _estimate_complexity(self, query: str) -> int:
         """Estimate query complexity (1-10)."""
-        # Simple heuristic
-        length_score = min(len(query) // 50, 5)
-        question_marks = query.count("?")
-        complexity_words = sum(
-            1
-            for word in ["complex", "advanced", "detailed", "comprehensive"]
-            if word in query.lower()
-        )
-
-        complexity = length_score + question_marks + complexity_words
-        return min(max(complexity, 1), 10)
+        return _estimate_complexity(query)
 
     def _recommend_provider(self, category: str) -> str:
         """Recommend best provider for category."""
@@ -263,10 +277,6 @@ class IntelligenceEngine:
             }
         )
 
-        # Keep only last 1000 records
-        if len(self.performance_history) > 1000:
-            self.performance_history = self.performance_history[-1000:]
-
     def get_insights(self) -> Dict[str, Any]:
         """Get AI insights and recommendations."""
         patterns_stats = self.usage_patterns.get_stats()
@@ -2,11 +2,13 @@
 Enterprise-grade knowledge base for context management.
 """
 
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterable, List, Any, Optional, Set
 from datetime import datetime
-import json
 import os
 from dataclasses import dataclass, field
+import numpy as np
+from .engine import _ensure_capacity
+from .persistence import DeferredSave, read_json, write_json_atomic
 
 
 @dataclass
@@ -23,16 +25,37 @@ class KnowledgeEntry:
     updated_at: datetime = field(default_factory=datetime.now)
     access_count: int = 0
     metadata: Dict[str, Any] = field(default_factory=dict)
+    _searchable: str = field(default="", init=False, repr=False, compare=False)
 
+    def __post_init__(self):
+        self._index_text()
 
-class KnowledgeBase:
+    def _index_text(self):
+        """Lowercase title, content and tags once for substring search."""
+        self._searchable = "\x00".join([self.title, self.content, *self.tags]).lower()
+
+
+class KnowledgeBase(DeferredSave):
     """Enterprise knowledge base for storing and retrieving information."""
 
     def __init__(self, storage_dir: str = ".rlm_cache/knowledge"):
         self.storage_dir = storage_dir
         self.entries: Dict[str, KnowledgeEntry] = {}
-        self.categories: Dict[str, List[str]] = {}  # category -> entry_ids
-        self.tags: Dict[str, List[str]] = {}  # tag -> entry_ids
+        self.categories: Dict[str, Set[str]] = {}  # category -> entry_ids
+        self.tags: Dict[str, Set[str]] = {}  # tag -> entry_ids
+        # Entry ids by row, with each row's priority, access count and
+        # insertion sequence number, so search filters and ranks with array
+        # ops before touching entries
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._priorities = np.zeros(16, dtype=np.int64)
+        self._access_counts = np.zeros(16, dtype=np.int64)
+        self._seqs = np.zeros(16, dtype=np.int64)
+        self._next_seq = 0
+        # Serialized entries, dropped when an entry changes so a save only
+        # re-encodes (and re-formats the timestamps of) changed entries
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._init_deferred_save()
         self._load()
 
     def add(
@@ -57,20 +80,14 @@ class KnowledgeBase:
                 metadata=metadata or {},
             )
 
-            self.entries[id] = entry
+            self._index_entry(entry)
 
             # Update category index
-            if category not in self.categories:
-                self.categories[category] = []
-            if id not in self.categories[category]:
-                self.categories[category].append(id)
+            self.categories.setdefault(category, set()).add(id)
 
             # Update tag index
             for tag in entry.tags:
-                if tag not in self.tags:
-                    self.tags[tag] = []
-                if id not in self.tags[tag]:
-                    self.tags[tag].append(id)
+                self.tags.setdefault(tag, set()).add(id)
 
             self._save()
             return True
@@ -85,7 +102,10 @@ class KnowledgeBase:
         if entry:
             entry.access_count += 1
             entry.updated_at = datetime.now()
-            self._save()
+            self._access_counts[self._rows[id]] = entry.access_count
+            self._records.pop(id, None)
+            # Reads never write; access counts go out with the next flush
+            self._mark_dirty()
         return entry
 
     def search(
@@ -97,9 +117,23 @@ class KnowledgeBase:
         limit: int = 10,
     ) -> List[KnowledgeEntry]:
         """Search knowledge base."""
+        n = len(self._ids)
+        priorities = self._priorities[:n]
+
+        # Filter by priority, then rank by priority and access count (insertion
+        # order among ties) so the remaining filters can stop at limit
+        rows = np.flatnonzero(priorities >= min_priority)
+        order = np.lexsort(
+            (self._seqs[rows], -self._access_counts[rows], -priorities[rows])
+        )
+
+        query_lower = query.lower() if query else None
         results = []
+        for row in rows[order]:
+            if len(results) >= limit:
+                break
+            entry = self.entries[self._ids[row]]
 
-        for entry in self.entries.values():
             # Filter by category
             if category and entry.category != category:
                 continue
@@ -108,35 +142,29 @@ class KnowledgeBase:
             if tags and not any(tag in entry.tags for tag in tags):
                 continue
 
-            # Filter by priority
-            if entry.priority < min_priority:
-                continue
-
             # Filter by query (simple keyword match)
-            if query:
-                query_lower = query.lower()
-                if not (
-                    query_lower in entry.title.lower()
-                    or query_lower in entry.content.lower()
-                    or any(query_lower in tag.lower() for tag in entry.tags)
-                ):
-                    continue
+            if query_lower and query_lower not in entry._searchable:
+                continue
 
             results.append(entry)
 
-        # Sort by priority and access count
-        results.sort(key=lambda e: (e.priority, e.access_count), reverse=True)
-        return results[:limit]
+        return results
 
     def get_by_category(self, category: str) -> List[KnowledgeEntry]:
         """Get all entries in category."""
-        entry_ids = self.categories.get(category, [])
-        return [self.entries[id] for id in entry_ids if id in self.entries]
+        return self._in_insertion_order(self.categories.get(category, ()))
 
     def get_by_tag(self, tag: str) -> List[KnowledgeEntry]:
         """Get all entries with tag."""
-        entry_ids = self.tags.get(tag, [])
-        return [self.entries[id] for id in entry_ids if id in self.entries]
+        return self._in_insertion_order(self.tags.get(tag, ()))
+
+    def _in_insertion_order(self, entry_ids: Iterable[str]) -> List[KnowledgeEntry]:
+        """Entries for the ids that still exist, oldest first."""
+        rows = sorted(
+            (self._rows[id] for id in entry_ids if id in self._rows),
+            key=self._seqs.__getitem__,
+        )
+        return [self.entries[self._ids[row]] for row in rows]
 
     def update(self, id: str, **kwargs):
         """Update entry."""
@@ -147,7 +175,12 @@ class KnowledgeBase:
         for key, value in kwargs.items():
             if hasattr(entry, key):
                 setattr(entry, key, value)
+        entry._index_text()
 
+        row = self._rows[id]
+        self._priorities[row] = entry.priority
+        self._access_counts[row] = entry.access_count
+        self._records.pop(id, None)
         entry.updated_at = datetime.now()
         self._save()
         return True
@@ -161,17 +194,48 @@ class KnowledgeBase:
 
         # Remove from category index
         if entry.category in self.categories:
-            self.categories[entry.category].remove(id)
+            self.categories[entry.category].discard(id)
 
         # Remove from tag index
         for tag in entry.tags:
             if tag in self.tags:
-                self.tags[tag].remove(id)
+                self.tags[tag].discard(id)
 
         del self.entries[id]
+        self._unindex_entry(id)
         self._save()
         return True
 
+    def _index_entry(self, entry: KnowledgeEntry):
+        """Store an entry, giving it a row (or reusing its row) in the arrays."""
+        self.entries[entry.id] = entry
+        self._records.pop(entry.id, None)
+        row = self._rows.get(entry.id)
+        if row is None:
+            row = len(self._ids)
+            self._ids.append(entry.id)
+            self._rows[entry.id] = row
+            self._priorities = _ensure_capacity(self._priorities, row + 1)
+            self._access_counts = _ensure_capacity(self._access_counts, row + 1)
+            self._seqs = _ensure_capacity(self._seqs, row + 1)
+            self._seqs[row] = self._next_seq
+            self._next_seq += 1
+        self._priorities[row] = entry.priority
+        self._access_counts[row] = entry.access_count
+
+    def _unindex_entry(self, id: str):
+        """Drop an entry's row, moving the last row into it."""
+        self._records.pop(id, None)
+        row = self._rows.pop(id)
+        last = len(self._ids) - 1
+        last_id = self._ids.pop()
+        if row != last:
+            self._ids[row] = last_id
+            self._rows[last_id] = row
+            self._priorities[row] = self._priorities[last]
+            self._access_counts[row] = self._access_counts[last]
+            self._seqs[row] = self._seqs[last]
+
     def get_stats(self) -> Dict[str, Any]:
         """Get knowledge base statistics."""
         total_access = sum(e.access_count for e in self.entries.values())
@@ -188,41 +252,44 @@ class KnowledgeBase:
             ),
         }
 
-    def _save(self):
+    def _save_now(self):
         """Save to disk."""
         os.makedirs(self.storage_dir, exist_ok=True)
 
+        records = self._records
+        for id, e in self.entries.items():
+            if id not in records:
+                records[id] = self._entry_to_record(e)
+
         data = {
-            "entries": {
-                id: {
-                    "category": e.category,
-                    "title": e.title,
-                    "content": e.content,
-                    "tags": e.tags,
-                    "priority": e.priority,
-                    "created_at": e.created_at.isoformat(),
-                    "updated_at": e.updated_at.isoformat(),
-                    "access_count": e.access_count,
-                    "metadata": e.metadata,
-                }
-                for id, e in self.entries.items()
-            },
-            "categories": self.categories,
-            "tags": self.tags,
+            "entries": {id: records[id] for id in self.entries},
+            "categories": {c: list(ids) for c, ids in self.categories.items()},
+            "tags": {t: list(ids) for t, ids in self.tags.items()},
         }
 
-        with open(os.path.join(self.storage_dir, "knowledge.json"), "w") as f:
-            json.dump(data, f, indent=2)
+        write_json_atomic(os.path.join(self.storage_dir, "knowledge.json"), data)
+
+    @staticmethod
+    def _entry_to_record(e: KnowledgeEntry) -> Dict[str, Any]:
+        """Serialize an entry (without its id, which keys the record)."""
+        return {
+            "category": e.category,
+            "title": e.title,
+            "content": e.content,
+            "tags": e.tags,
+            "priority": e.priority,
+            "created_at": e.created_at.isoformat(),
+            "updated_at": e.updated_at.isoformat(),
+            "access_count": e.access_count,
+            "metadata": e.metadata,
+        }
 
     def _load(self):
         """Load from disk."""
-        filepath = os.path.join(self.storage_dir, "knowledge.json")
-        if not os.path.exists(filepath):
-            return
-
         try:
-            with open(filepath, "r") as f:
-                data = json.load(f)
+            data = read_json(os.path.join(self.storage_dir, "knowledge.json"))
+            if data is None:
+                return
 
             for id, entry_data in data.get("entries", {}).items():
                 entry = KnowledgeEntry(
@@ -237,10 +304,13 @@ class KnowledgeBase:
                     access_count=entry_data["access_count"],
                     metadata=entry_data["metadata"],
                 )
-                self.entries[id] = entry
+                self._index_entry(entry)
+                self._records[id] = entry_data
 
-            self.categories = data.get("categories", {})
-            self.tags = data.get("tags", {})
+            self.categories = {
+                c: set(ids) for c, ids in data.get("categories", {}).items()
+            }
+            self.tags = {t: set(ids) for t, ids in data.get("tags", {}).items()}
 
         except Exception as e:
             print(f"⚠️  Failed to load knowledge base: {e}")
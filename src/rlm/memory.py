@@ -2,12 +2,16 @@
 Long-term memory system - Agent remembers everything.
 """
 
-from typing import Dict, List, Any, Optional
+from typing import Deque, Dict, List, Any, Optional, Set
 from datetime import datetime, timedelta
+from collections import Counter, defaultdict, deque
+import heapq
+import itertools
 import json
 import os
 from dataclasses import dataclass, field
 import hashlib
+from .persistence import DeferredSave, read_json, write_json_atomic
 
 
 @dataclass
@@ -27,17 +31,42 @@ class MemoryEntry:
     metadata: Dict[str, Any] = field(default_factory=dict)
 
 
-class LongTermMemory:
+def _new_pattern() -> Dict[str, Any]:
+    """Empty learned pattern for a word."""
+    return {
+        "count": 0,
+        "successful_responses": 0,
+        "providers": Counter(),
+        "avg_tokens": 0,
+    }
+
+
+class LongTermMemory(DeferredSave):
     """
     Agent's long-term memory - remembers everything forever.
     Never forgets, always learns.
     """
 
+    max_history = 100_000  # conversation turns kept for context
+
     def __init__(self, storage_dir: str = ".rlm_cache/memory"):
         self.storage_dir = storage_dir
         self.memories: Dict[str, MemoryEntry] = {}
-        self.conversation_history: List[str] = []
-        self.learned_patterns: Dict[str, Any] = {}
+        self.conversation_history: Deque[str] = deque(maxlen=self.max_history)
+        self.learned_patterns: Dict[str, Any] = defaultdict(_new_pattern)
+        # Lowercase query words per memory, the inverted word -> ids index
+        # recall() scores from, and insertion order for stable ranking
+        self._query_words: Dict[str, frozenset] = {}
+        self._word_index: Dict[str, Set[str]] = defaultdict(set)
+        self._order: Dict[str, int] = {}
+        # Exact query text -> ids of memories with that query, oldest first
+        self._exact_index: Dict[str, List[str]] = {}
+        self._counter = itertools.count()
+        # Memories are appended to a JSONL log; learned patterns are saved whole
+        self.log_file = os.path.join(storage_dir, "memories.jsonl")
+        self._log_records = 0
+        os.makedirs(storage_dir, exist_ok=True)
+        self._init_deferred_save()
         self._load()
 
     def remember(
@@ -69,52 +98,80 @@ class LongTermMemory:
             metadata=metadata or {},
         )
 
-        self.memories[memory_id] = memory
+        self._add_memory(memory)
         self.conversation_history.append(memory_id)
 
         # Learn from this interaction
         self._learn_from_memory(memory)
 
-        # Save immediately
+        # Persist: the memory is appended now, patterns are saved coalesced
+        self._append(self._memory_to_record(memory))
         self._save()
 
         return memory_id
 
     def recall(self, query: str, limit: int = 5) -> List[MemoryEntry]:
         """Recall similar past interactions."""
-        query_lower = query.lower()
-        query_words = set(query_lower.split())
-
-        scored_memories = []
-
-        for memory in self.memories.values():
-            # Calculate similarity
-            memory_words = set(memory.query.lower().split())
-            common_words = query_words & memory_words
-
-            if common_words:
-                score = len(common_words) / max(len(query_words), len(memory_words))
-                scored_memories.append((score, memory))
-
-        # Sort by score
-        scored_memories.sort(key=lambda x: x[0], reverse=True)
-
-        return [m for _, m in scored_memories[:limit]]
+        query_words = set(query.lower().split())
+
+        # Walking the posting lists counts the shared words of every memory
+        # that has any, without intersecting word sets
+        common_counts = Counter()
+        for word in query_words:
+            common_counts.update(self._word_index.get(word, ()))
+
+        # Similarity is shared words over the larger word set
+        query_size = len(query_words)
+        memory_words = self._query_words
+        order = self._order
+        scored_memories = [
+            (-common / max(query_size, len(memory_words[id])), order[id], id)
+            for id, common in common_counts.items()
+        ]
+
+        # Best score first, older memories first among ties
+        top = heapq.nsmallest(limit, scored_memories)
+        return [self.memories[id] for _, _, id in top]
 
     def recall_exact(self, query: str) -> Optional[MemoryEntry]:
         """Check if exact query was asked before."""
-        query_hash = hashlib.sha256(query.encode()).hexdigest()
-
-        for memory in self.memories.values():
-            memory_hash = hashlib.sha256(memory.query.encode()).hexdigest()
-            if memory_hash == query_hash:
-                return memory
-
-        return None
+        memory_ids = self._exact_index.get(query)
+        return self.memories[memory_ids[0]] if memory_ids else None
+
+    def _add_memory(self, memory: MemoryEntry):
+        """Store a memory and index its query words, replacing any with its id."""
+        if memory.id in self.memories:
+            self._drop_memory(memory.id)
+        words = frozenset(memory.query.lower().split())
+        self.memories[memory.id] = memory
+        self._query_words[memory.id] = words
+        self._order[memory.id] = next(self._counter)
+        self._exact_index.setdefault(memory.query, []).append(memory.id)
+        for word in words:
+            self._word_index[word].add(memory.id)
+
+    def _drop_memory(self, memory_id: str) -> bool:
+        """Remove a memory and its index entries; False if it was unknown."""
+        memory = self.memories.pop(memory_id, None)
+        if memory is None:
+            return False
+        same_query = self._exact_index[memory.query]
+        same_query.remove(memory_id)
+        if not same_query:
+            del self._exact_index[memory.query]
+        for word in self._query_words.pop(memory_id):
+            ids = self._word_index[word]
+            ids.discard(memory_id)
+            if not ids:
+                del self._word_index[word]
+        del self._order[memory_id]
+        return True
 
     def get_conversation_context(self, last_n: int = 10) -> str:
         """Get recent conversation context."""
-        recent_ids = self.conversation_history[-last_n:]
+        recent_ids = reversed(
+            list(itertools.islice(reversed(self.conversation_history), last_n))
+        )
         context_parts = []
 
         for memory_id in recent_ids:
@@ -131,14 +188,6 @@ class LongTermMemory:
 
         for word in words:
             if len(word) > 3:  # Skip short words
-                if word not in self.learned_patterns:
-                    self.learned_patterns[word] = {
-                        "count": 0,
-                        "successful_responses": 0,
-                        "providers": {},
-                        "avg_tokens": 0,
-                    }
-
                 pattern = self.learned_patterns[word]
                 pattern["count"] += 1
 
@@ -146,9 +195,7 @@ class LongTermMemory:
                     pattern["successful_responses"] += 1
 
                 if memory.provider:
-                    pattern["providers"][memory.provider] = (
-                        pattern["providers"].get(memory.provider, 0) + 1
-                    )
+                    pattern["providers"][memory.provider] += 1
 
                 # Update average tokens
                 pattern["avg_tokens"] = (
@@ -161,15 +208,15 @@ class LongTermMemory:
             return {}
 
         # Most common topics
-        top_topics = sorted(
-            self.learned_patterns.items(), key=lambda x: x[1]["count"], reverse=True
-        )[:10]
+        top_topics = heapq.nlargest(
+            10, self.learned_patterns.items(), key=lambda x: x[1]["count"]
+        )
 
         # Best providers per topic
         provider_recommendations = {}
         for topic, data in top_topics:
             if data["providers"]:
-                best_provider = max(data["providers"].items(), key=lambda x: x[1])[0]
+                best_provider = data["providers"].most_common(1)[0][0]
                 provider_recommendations[topic] = best_provider
 
         return {
@@ -194,37 +241,73 @@ class LongTermMemory:
         content = f"{query}:{response}:{datetime.now().isoformat()}"
         return hashlib.sha256(content.encode()).hexdigest()
 
-    def _save(self):
-        """Save memories to disk."""
-        os.makedirs(self.storage_dir, exist_ok=True)
-
-        # Save memories
-        memories_data = {
-            id: {
-                "timestamp": m.timestamp.isoformat(),
-                "query": m.query,
-                "response": m.response,
-                "context": m.context,
-                "provider": m.provider,
-                "model": m.model,
-                "tokens_used": m.tokens_used,
-                "success": m.success,
-                "feedback": m.feedback,
-                "metadata": m.metadata,
-            }
-            for id, m in self.memories.items()
-        }
+    def _save_now(self):
+        """Save learned patterns to disk (memories live in the append-only log)."""
+        write_json_atomic(
+            os.path.join(self.storage_dir, "patterns.json"), self.learned_patterns
+        )
 
-        with open(os.path.join(self.storage_dir, "memories.json"), "w") as f:
-            json.dump(memories_data, f, indent=2)
+    @staticmethod
+    def _memory_to_record(m: MemoryEntry) -> Dict[str, Any]:
+        """Serialize a memory as a log record."""
+        return {
+            "op": "set",
+            "id": m.id,
+            "timestamp": m.timestamp.isoformat(),
+            "query": m.query,
+            "response": m.response,
+            "context": m.context,
+            "provider": m.provider,
+            "model": m.model,
+            "tokens_used": m.tokens_used,
+            "success": m.success,
+            "feedback": m.feedback,
+            "metadata": m.metadata,
+        }
 
-        # Save conversation history
-        with open(os.path.join(self.storage_dir, "history.json"), "w") as f:
-            json.dump(self.conversation_history, f, indent=2)
+    @staticmethod
+    def _memory_from_record(id: str, m: Dict[str, Any]) -> MemoryEntry:
+        """Build a memory from its serialized form."""
+        return MemoryEntry(
+            id=id,
+            timestamp=datetime.fromisoformat(m["timestamp"]),
+            query=m["query"],
+            response=m["response"],
+            context=m["context"],
+            provider=m["provider"],
+            model=m["model"],
+            tokens_used=m["tokens_used"],
+            success=m["success"],
+            feedback=m.get("feedback"),
+            metadata=m.get("metadata", {}),
+        )
 
-        # Save learned patterns
-        with open(os.path.join(self.storage_dir, "patterns.json"), "w") as f:
-            json.dump(self.learned_patterns, f, indent=2)
+    def _append(self, *records: Dict[str, Any]):
+        """Append records to the memory log, compacting once it outgrows it."""
+        try:
+            with open(self.log_file, "a") as f:
+                for record in records:
+                    f.write(json.dumps(record, separators=(",", ":")) + "\n")
+            self._log_records += len(records)
+        except Exception as e:
+            print(f"⚠️  Failed to save memories: {e}")
+            return
+
+        if self._log_records > 2 * max(len(self.memories), 1):
+            self._compact()
+
+    def _compact(self):
+        """Rewrite the memory log as one record per live memory."""
+        tmp_file = self.log_file + ".tmp"
+        try:
+            with open(tmp_file, "w") as f:
+                for memory in self.memories.values():
+                    record = self._memory_to_record(memory)
+                    f.write(json.dumps(record, separators=(",", ":")) + "\n")
+            os.replace(tmp_file, self.log_file)
+            self._log_records = len(self.memories)
+        except Exception as e:
+            print(f"⚠️  Failed to save memories: {e}")
 
     def _load(self):
         """Load memories from disk."""
@@ -232,27 +315,14 @@ class LongTermMemory:
         history_file = os.path.join(self.storage_dir, "history.json")
         patterns_file = os.path.join(self.storage_dir, "patterns.json")
 
-        # Load memories
+        # Load memories saved as a single snapshot by older versions
         if os.path.exists(memories_file):
             try:
                 with open(memories_file, "r") as f:
                     data = json.load(f)
 
                 for id, m in data.items():
-                    memory = MemoryEntry(
-                        id=id,
-                        timestamp=datetime.fromisoformat(m["timestamp"]),
-                        query=m["query"],
-                        response=m["response"],
-                        context=m["context"],
-                        provider=m["provider"],
-                        model=m["model"],
-                        tokens_used=m["tokens_used"],
-                        success=m["success"],
-                        feedback=m.get("feedback"),
-                        metadata=m.get("metadata", {}),
-                    )
-                    self.memories[id] = memory
+                    self._add_memory(self._memory_from_record(id, m))
             except Exception as e:
                 print(f"⚠️  Failed to load memories: {e}")
 
@@ -260,17 +330,50 @@ class LongTermMemory:
         if os.path.exists(history_file):
             try:
                 with open(history_file, "r") as f:
-                    self.conversation_history = json.load(f)
+                    self.conversation_history.extend(json.load(f))
             except Exception as e:
                 print(f"⚠️  Failed to load history: {e}")
 
-        # Load patterns
-        if os.path.exists(patterns_file):
+        # Replay the memory log; its order is the conversation history
+        if os.path.exists(self.log_file):
+            dropped = False
             try:
-                with open(patterns_file, "r") as f:
-                    self.learned_patterns = json.load(f)
+                with open(self.log_file, "r") as f:
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        record = json.loads(line)
+                        if record["op"] == "set":
+                            memory = self._memory_from_record(record["id"], record)
+                            self._add_memory(memory)
+                            self.conversation_history.append(memory.id)
+                        elif self._drop_memory(record["id"]):
+                            dropped = True
+                        self._log_records += 1
             except Exception as e:
-                print(f"⚠️  Failed to load patterns: {e}")
+                print(f"⚠️  Failed to load memories: {e}")
+
+            # Deleted memories leave the history in one pass after the replay
+            if dropped:
+                self.conversation_history = deque(
+                    (id for id in self.conversation_history if id in self.memories),
+                    maxlen=self.max_history,
+                )
+
+        if os.path.exists(memories_file):
+            # Migrate the old snapshot format into the log
+            self._compact()
+            os.remove(memories_file)
+            if os.path.exists(history_file):
+                os.remove(history_file)
+
+        # Load patterns
+        try:
+            for word, pattern in (read_json(patterns_file) or {}).items():
+                pattern["providers"] = Counter(pattern["providers"])
+                self.learned_patterns[word] = pattern
+        except Exception as e:
+            print(f"⚠️  Failed to load patterns: {e}")
 
     def clear_old_memories(self, days: int = 365):
         """Clear memories older than specified days (default: keep 1 year)."""
@@ -279,9 +382,13 @@ class LongTermMemory:
         old_ids = [id for id, m in self.memories.items() if m.timestamp < cutoff]
 
         for id in old_ids:
-            del self.memories[id]
-            if id in self.conversation_history:
-                self.conversation_history.remove(id)
-
-        self._save()
+            self._drop_memory(id)
+
+        if old_ids:
+            old_ids_set = set(old_ids)
+            self.conversation_history = deque(
+                (id for id in self.conversation_history if id not in old_ids_set),
+                maxlen=self.max_history,
+            )
+            self._append(*({"op": "del", "id": id} for id in old_ids))
         return len(old_ids)
@@ -0,0 +1,117 @@
+"""
+Deferred persistence shared by the RLM stores.
+"""
+
+import atexit
+import functools
+import json
+import os
+import tempfile
+import time
+import weakref
+from typing import Any
+
+
+@functools.lru_cache(maxsize=1)
+def _zstd():
+    """The zstandard module, or None when it is not installed."""
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def write_json_atomic(path: str, data: Any):
+    """
+    Write data as compact JSON to a temp file, then rename it over path.
+
+    With zstandard installed the JSON is compressed and written to path.zst
+    instead; whichever copy is not written is removed so reads never pick up
+    a stale one.
+    """
+    payload = json.dumps(data, separators=(",", ":")).encode()
+    zstd = _zstd()
+    if zstd is not None:
+        payload = zstd.ZstdCompressor(level=3).compress(payload)
+        target, stale = path + ".zst", path
+    else:
+        target, stale = path, path + ".zst"
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, target)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+    if os.path.exists(stale):
+        os.remove(stale)
+
+
+def read_json(path: str) -> Any:
+    """Read JSON written by write_json_atomic; None if there is none yet."""
+    if os.path.exists(path + ".zst"):
+        zstd = _zstd()
+        if zstd is None:
+            raise ImportError(
+                f"{path}.zst is compressed. Install: pip install zstandard"
+            )
+        with open(path + ".zst", "rb") as f:
+            return json.loads(zstd.ZstdDecompressor().decompress(f.read()))
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    return None
+
+
+class DeferredSave:
+    """
+    Coalesce frequent saves into at most one write per flush interval.
+
+    Stores implement _save_now() to write everything to disk. Mutators call
+    _save(), which marks the store dirty and only writes when the previous
+    write is older than flush_interval; skipped changes go out with the next
+    write. Writes only ever happen on the caller's thread: flush() writes
+    pending changes now, and live stores are flushed when the interpreter exits.
+    """
+
+    flush_interval = 5.0  # seconds
+
+    def _init_deferred_save(self):
+        self._dirty = False
+        self._last_save = 0.0
+        _live_stores.add(self)
+
+    def _mark_dirty(self):
+        """Mark the store changed without writing now."""
+        self._dirty = True
+
+    def _save(self):
+        """Mark the store changed; write it if the last write is old enough."""
+        self._dirty = True
+        if time.monotonic() - self._last_save >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Write pending changes to disk now."""
+        if not self._dirty:
+            return
+        self._dirty = False
+        self._last_save = time.monotonic()
+        self._save_now()
+
+    def _save_now(self):
+        raise NotImplementedError
+
+
+# Every store, held weakly so unused ones can be collected
+_live_stores: "weakref.WeakSet[DeferredSave]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_live_stores():
+    for store in list(_live_stores):
+        store.flush()
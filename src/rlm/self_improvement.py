@@ -2,13 +2,55 @@
 Self-improvement system - Agent learns and improves like an LLM.
 """
 
-from typing import Dict, List, Any
+from typing import Deque, Dict, List, Any
 from datetime import datetime
+from collections import Counter, deque
+import functools
 import json
 import os
-
-
-class SelfImprovementEngine:
+from .persistence import DeferredSave, read_json, write_json_atomic
+
+# Word pairs that contradict each other when they appear close together
+_CONTRADICTION_PAIRS = (
+    ("yes", "no"),
+    ("true", "false"),
+    ("always", "never"),
+    ("all", "none"),
+    ("correct", "incorrect"),
+)
+
+_STOPWORDS = frozenset(
+    {
+        "the",
+        "a",
+        "an",
+        "and",
+        "or",
+        "but",
+        "in",
+        "on",
+        "at",
+        "to",
+        "for",
+    }
+)
+
+
+@functools.lru_cache(maxsize=1024)
+def _query_words(query: str) -> frozenset:
+    """Lowercase word set of a query, memoized since retries repeat it."""
+    return frozenset(query.lower().split())
+
+
+@functools.lru_cache(maxsize=1024)
+def _extract_keywords(text: str) -> tuple:
+    """Keywords of a text, memoized since the same queries recur."""
+    words = text.lower().split()
+    keywords = [w for w in words if len(w) > 3 and w not in _STOPWORDS]
+    return tuple(keywords[:10])
+
+
+class SelfImprovementEngine(DeferredSave):
     """
     Agent self-improvement system.
 
@@ -20,13 +62,25 @@ class SelfImprovementEngine:
     - Adapts to user preferences
     """
 
+    max_log_entries = 1000
+
     def __init__(self, storage_dir: str = ".rlm_cache/improvement"):
         self.storage_dir = storage_dir
-        self.improvement_log: List[Dict] = []
-        self.mistake_patterns: Dict[str, int] = {}
-        self.success_patterns: Dict[str, int] = {}
+        # Recent feedback only; older records just feed the pattern counters
+        self.improvement_log: Deque[Dict] = deque(maxlen=self.max_log_entries)
+        self._total_improvements = 0
+        self.mistake_patterns: Dict[str, int] = Counter()
+        self.success_patterns: Dict[str, int] = Counter()
         self.hallucination_indicators: List[str] = []
         self.quality_scores: List[float] = []
+        # The last 10 scores and the 10 before them, for the quality trend
+        self._recent_scores = deque(maxlen=10)
+        self._older_scores = deque(maxlen=10)
+        # Feedback is appended to a JSONL log; patterns and scores are saved whole
+        self.log_file = os.path.join(storage_dir, "improvements.jsonl")
+        self._log_lines = 0
+        os.makedirs(storage_dir, exist_ok=True)
+        self._init_deferred_save()
         self._load()
         self._init_hallucination_detection()
 
@@ -82,8 +136,8 @@ class SelfImprovementEngine:
             suggestions.append("Provide more detailed explanation")
 
         # 3. Check if response addresses query
-        query_words = set(query.lower().split())
-        response_words = set(response.lower().split())
+        query_words = _query_words(query)
+        response_words = set(response_lower.split())
         overlap = len(query_words & response_words)
 
         if overlap < len(query_words) * 0.3:
@@ -92,16 +146,21 @@ class SelfImprovementEngine:
             suggestions.append("Ensure response directly answers the question")
 
         # 4. Check for contradictions
-        if self._detect_contradiction(response):
+        if self._detect_contradiction(response, response_lower):
             issues.append("Potential contradiction detected")
             confidence -= 0.4
             suggestions.append("Review response for consistency")
 
-        # 5. Check context usage
-        if context and context not in response:
-            issues.append("Context not utilized")
-            confidence -= 0.1
-            suggestions.append("Incorporate provided context")
+        # 5. Check context usage (share of context words the response uses)
+        if context:
+            context_words = set(context.lower().split())
+            context_overlap = len(context_words & response_words) / max(
+                1, len(context_words)
+            )
+            if context_overlap < 0.1:
+                issues.append("Context not utilized")
+                confidence -= 0.1
+                suggestions.append("Incorporate provided context")
 
         confidence = max(0.0, min(1.0, confidence))
         is_valid = confidence >= 0.7
@@ -114,25 +173,20 @@ class SelfImprovementEngine:
             "hallucination_risk": hallucination_count > 2,
         }
 
-    def _detect_contradiction(self, text: str) -> bool:
-        """Detect potential contradictions in text."""
-        contradiction_pairs = [
-            ("yes", "no"),
-            ("true", "false"),
-            ("always", "never"),
-            ("all", "none"),
-            ("correct", "incorrect"),
-        ]
-
-        text_lower = text.lower()
-
-        for word1, word2 in contradiction_pairs:
-            if word1 in text_lower and word2 in text_lower:
-                # Check if they're close together (potential contradiction)
-                pos1 = text_lower.find(word1)
-                pos2 = text_lower.find(word2)
-                if abs(pos1 - pos2) < 100:  # Within 100 chars
-                    return True
+    def _detect_contradiction(self, text: str, text_lower: str = None) -> bool:
+        """Detect potential contradictions in text (text_lower if already known)."""
+        if text_lower is None:
+            text_lower = text.lower()
+
+        for word1, word2 in _CONTRADICTION_PAIRS:
+            # One find per word gives both presence and first position
+            pos1 = text_lower.find(word1)
+            if pos1 < 0:
+                continue
+            pos2 = text_lower.find(word2)
+            # Check if they're close together (potential contradiction)
+            if pos2 >= 0 and abs(pos1 - pos2) < 100:  # Within 100 chars
+                return True
 
         return False
 
@@ -149,25 +203,22 @@ class SelfImprovementEngine:
         }
 
         self.improvement_log.append(improvement)
+        self._total_improvements += 1
+        self._append(improvement)
+        self._log_lines += 1
+        if self._log_lines > 2 * self.max_log_entries:
+            self._compact_log()
 
         # Track patterns
         if rating >= 4:
             # Success pattern
-            keywords = self._extract_keywords(query)
-            for keyword in keywords:
-                self.success_patterns[keyword] = (
-                    self.success_patterns.get(keyword, 0) + 1
-                )
+            self.success_patterns.update(_extract_keywords(query))
         elif rating <= 2:
             # Mistake pattern
-            keywords = self._extract_keywords(query)
-            for keyword in keywords:
-                self.mistake_patterns[keyword] = (
-                    self.mistake_patterns.get(keyword, 0) + 1
-                )
+            self.mistake_patterns.update(_extract_keywords(query))
 
         # Track quality
-        self.quality_scores.append(rating / 5.0)
+        self._track_quality(rating / 5.0)
 
         self._save()
 
@@ -178,42 +229,30 @@ class SelfImprovementEngine:
 
         # Check for known mistake patterns
         for keyword in keywords:
-            if keyword in self.mistake_patterns:
-                count = self.mistake_patterns[keyword]
-                if count > 2:
-                    suggestions.append(
-                        f"Be careful with '{keyword}' - {count} past issues"
-                    )
+            count = self.mistake_patterns[keyword]  # 0 when unseen
+            if count > 2:
+                suggestions.append(f"Be careful with '{keyword}' - {count} past issues")
 
         # Check for success patterns
         for keyword in keywords:
-            if keyword in self.success_patterns:
-                count = self.success_patterns[keyword]
-                if count > 3:
-                    suggestions.append(
-                        f"Good track record with '{keyword}' - continue approach"
-                    )
+            count = self.success_patterns[keyword]
+            if count > 3:
+                suggestions.append(
+                    f"Good track record with '{keyword}' - continue approach"
+                )
 
         return suggestions
 
     def _extract_keywords(self, text: str) -> List[str]:
         """Extract keywords from text."""
-        words = text.lower().split()
-        stopwords = {
-            "the",
-            "a",
-            "an",
-            "and",
-            "or",
-            "but",
-            "in",
-            "on",
-            "at",
-            "to",
-            "for",
-        }
-        keywords = [w for w in words if len(w) > 3 and w not in stopwords]
-        return keywords[:10]
+        return list(_extract_keywords(text))
+
+    def _track_quality(self, score: float):
+        """Record a score, sliding the oldest recent score into the older window."""
+        self.quality_scores.append(score)
+        if len(self._recent_scores) == self._recent_scores.maxlen:
+            self._older_scores.append(self._recent_scores[0])
+        self._recent_scores.append(score)
 
     def get_quality_trend(self) -> Dict[str, Any]:
         """Get quality improvement trend."""
@@ -221,10 +260,8 @@ class SelfImprovementEngine:
             return {"trend": "no_data", "current_quality": 0.0, "improvement": 0.0}
 
         # Calculate trend
-        recent_scores = self.quality_scores[-10:]
-        older_scores = (
-            self.quality_scores[-20:-10] if len(self.quality_scores) > 10 else []
-        )
+        recent_scores = self._recent_scores
+        older_scores = self._older_scores
 
         current_avg = sum(recent_scores) / len(recent_scores)
         older_avg = (
@@ -252,45 +289,84 @@ class SelfImprovementEngine:
         quality_trend = self.get_quality_trend()
 
         return {
-            "total_improvements": len(self.improvement_log),
+            "total_improvements": self._total_improvements,
             "mistake_patterns": len(self.mistake_patterns),
             "success_patterns": len(self.success_patterns),
             "quality_trend": quality_trend,
-            "top_mistakes": sorted(
-                self.mistake_patterns.items(), key=lambda x: x[1], reverse=True
-            )[:5],
-            "top_successes": sorted(
-                self.success_patterns.items(), key=lambda x: x[1], reverse=True
-            )[:5],
+            "top_mistakes": self.mistake_patterns.most_common(5),
+            "top_successes": self.success_patterns.most_common(5),
         }
 
-    def _save(self):
-        """Save improvement data."""
-        os.makedirs(self.storage_dir, exist_ok=True)
+    def _append(self, *improvements: Dict):
+        """Append feedback records to the improvement log."""
+        try:
+            with open(self.log_file, "a") as f:
+                for improvement in improvements:
+                    f.write(json.dumps(improvement, separators=(",", ":")) + "\n")
+        except Exception as e:
+            print(f"⚠️  Failed to save improvement log: {e}")
+
+    def _compact_log(self):
+        """Rewrite the improvement log as just the records still kept."""
+        tmp_file = self.log_file + ".tmp"
+        try:
+            with open(tmp_file, "w") as f:
+                for improvement in self.improvement_log:
+                    f.write(json.dumps(improvement, separators=(",", ":")) + "\n")
+            os.replace(tmp_file, self.log_file)
+            self._log_lines = len(self.improvement_log)
+        except Exception as e:
+            print(f"⚠️  Failed to save improvement log: {e}")
+            return
 
+        # The log no longer counts every feedback, so save the total now
+        self._mark_dirty()
+        self.flush()
+
+    def _save_now(self):
+        """Save improvement data (feedback lives in the append-only log)."""
         data = {
-            "improvement_log": self.improvement_log,
+            "total_improvements": self._total_improvements,
             "mistake_patterns": self.mistake_patterns,
             "success_patterns": self.success_patterns,
             "quality_scores": self.quality_scores,
         }
 
-        with open(os.path.join(self.storage_dir, "improvement.json"), "w") as f:
-            json.dump(data, f, indent=2)
+        write_json_atomic(os.path.join(self.storage_dir, "improvement.json"), data)
 
     def _load(self):
         """Load improvement data."""
-        filepath = os.path.join(self.storage_dir, "improvement.json")
-        if not os.path.exists(filepath):
-            return
-
         try:
-            with open(filepath, "r") as f:
-                data = json.load(f)
-
-            self.improvement_log = data.get("improvement_log", [])
-            self.mistake_patterns = data.get("mistake_patterns", {})
-            self.success_patterns = data.get("success_patterns", {})
-            self.quality_scores = data.get("quality_scores", [])
+            data = read_json(os.path.join(self.storage_dir, "improvement.json"))
+            if data is not None:
+                self.mistake_patterns = Counter(data.get("mistake_patterns", {}))
+                self.success_patterns = Counter(data.get("success_patterns", {}))
+                self.quality_scores = data.get("quality_scores", [])
+                self._total_improvements = data.get("total_improvements", 0)
+                self._recent_scores.extend(self.quality_scores[-10:])
+                self._older_scores.extend(self.quality_scores[-20:-10])
+
+                # Older versions kept the feedback log in the snapshot
+                legacy_log = data.get("improvement_log")
+                if legacy_log:
+                    if not os.path.exists(self.log_file):
+                        self._append(*legacy_log)
+                    self._save()
         except Exception as e:
             print(f"⚠️  Failed to load improvement data: {e}")
+
+        # Parse only the records kept from the end of the feedback log
+        if os.path.exists(self.log_file):
+            try:
+                lines = deque(maxlen=self.max_log_entries)
+                with open(self.log_file, "r") as f:
+                    for line in f:
+                        if line.strip():
+                            lines.append(line)
+                            self._log_lines += 1
+                self.improvement_log.extend(json.loads(line) for line in lines)
+                self._total_improvements = max(
+                    self._total_improvements, self._log_lines
+                )
+            except Exception as e:
+                print(f"⚠️  Failed to load improvement log: {e}")
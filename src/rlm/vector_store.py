@@ -4,10 +4,30 @@ Vector store for semantic search and similarity matching.
 
 import numpy as np
 from typing import List, Dict, Any, Optional, Tuple
+import functools
 import json
 import os
+import tempfile
 from dataclasses import dataclass, field
 from datetime import datetime
+from .engine import _encode_query, _ensure_capacity, _get_st_model, _normalize
+from .persistence import DeferredSave, read_json, write_json_atomic
+
+# Matrix dtype per precision. fp16 halves and int8 (unit vectors scaled by
+# 127) quarters the memory and disk footprint; both are upcast to float32 for
+# scoring since numpy has no BLAS kernel for them, so fp32 searches fastest.
+_PRECISION_DTYPES = {"fp32": np.float32, "fp16": np.float16, "int8": np.int8}
+_INT8_SCALE = 127.0
+
+
+@functools.lru_cache(maxsize=1)
+def _hnswlib():
+    """The hnswlib module, or None when it is not installed."""
+    try:
+        import hnswlib
+    except ImportError:
+        return None
+    return hnswlib
 
 
 @dataclass
@@ -23,23 +43,45 @@ class VectorEntry:
     last_accessed: Optional[datetime] = None
 
 
-class VectorStore:
+class VectorStore(DeferredSave):
     """High-performance vector store for semantic search."""
 
-    def __init__(self, dimension: int = 384, cache_dir: str = ".rlm_cache/vectors"):
+    add_batch_size = 64  # texts embedded per encode call
+    ann_threshold = 2000  # entries above which search uses an hnswlib index
+
+    def __init__(
+        self,
+        dimension: int = 384,
+        cache_dir: str = ".rlm_cache/vectors",
+        precision: str = "fp32",
+    ):
+        if precision not in _PRECISION_DTYPES:
+            raise ValueError(
+                f"precision must be one of {', '.join(_PRECISION_DTYPES)}, "
+                f"got {precision!r}"
+            )
         self.dimension = dimension
         self.cache_dir = cache_dir
+        self.precision = precision
         self.entries: Dict[str, VectorEntry] = {}
+        # Entry ids by row of a matrix of unit-length vectors, so a search is
+        # one matrix-vector product
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._matrix = np.zeros((16, dimension), dtype=_PRECISION_DTYPES[precision])
+        # Metadata values by row, one object column per key, for filtering
+        self._meta_columns: Dict[str, np.ndarray] = {}
+        self._pending: List[Tuple[str, str, Dict]] = []  # queued by add()
+        self._ann_index = None  # built on the first search of a large store
         self.embeddings_model = None
+        self._init_deferred_save()
         self._init_embeddings()
         self._load_store()
 
     def _init_embeddings(self):
         """Initialize embeddings model."""
         try:
-            from sentence_transformers import SentenceTransformer
-
-            self.embeddings_model = SentenceTransformer("all-MiniLM-L6-v2")
+            self.embeddings_model = _get_st_model()
             print("✅ Embeddings model loaded")
         except ImportError:
             print(
@@ -48,21 +90,56 @@ class VectorStore:
             self.embeddings_model = None
 
     def add(self, id: str, text: str, metadata: Dict = None) -> bool:
-        """Add text to vector store."""
+        """
+        Add text to vector store.
+
+        Texts are queued and embedded add_batch_size at a time; the queue is
+        also embedded before any search, add_many, get_stats or flush.
+        """
         if not self.embeddings_model:
             return False
 
+        self._pending.append((id, text, metadata))
+        if len(self._pending) >= self.add_batch_size:
+            return self._add_pending()
+        return True
+
+    def add_many(self, items: List[Tuple[str, str, Dict]]) -> int:
+        """Add (id, text, metadata) tuples with one batched encode and save."""
+        if not self.embeddings_model:
+            return 0
+
+        self._add_pending()
+        return self._encode_and_add(items)
+
+    def _add_pending(self) -> bool:
+        """Embed and add the texts queued by add(); False if that failed."""
+        items, self._pending = self._pending, []
+        return self._encode_and_add(items) == len(items)
+
+    def _encode_and_add(self, items: List[Tuple[str, str, Dict]]) -> int:
+        """Embed texts in batches and add them as entries."""
+        if not items:
+            return 0
+
         try:
-            vector = self.embeddings_model.encode(text)
-            entry = VectorEntry(
-                id=id, text=text, vector=vector, metadata=metadata or {}
+            vectors = self.embeddings_model.encode(
+                [text for _, text, _ in items],
+                batch_size=self.add_batch_size,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
             )
-            self.entries[id] = entry
-            self._save_store()
-            return True
+            for (id, text, metadata), vector in zip(items, vectors):
+                self._add_entry(
+                    VectorEntry(
+                        id=id, text=text, vector=vector, metadata=metadata or {}
+                    )
+                )
+            self._save()
+            return len(items)
         except Exception as e:
             print(f"⚠️  Failed to add to vector store: {e}")
-            return False
+            return 0
 
     def search(
         self,
@@ -72,47 +149,208 @@ class VectorStore:
         filter_metadata: Dict = None,
     ) -> List[Tuple[VectorEntry, float]]:
         """Search for similar entries."""
+        if self._pending:
+            self._add_pending()
         if not self.embeddings_model or not self.entries:
             return []
 
         try:
-            query_vector = self.embeddings_model.encode(query)
-            results = []
-
-            for entry in self.entries.values():
-                # Apply metadata filter
-                if filter_metadata:
-                    if not all(
-                        entry.metadata.get(k) == v for k, v in filter_metadata.items()
-                    ):
-                        continue
-
-                # Calculate similarity
-                similarity = self._cosine_similarity(query_vector, entry.vector)
-
-                if similarity >= threshold:
-                    # Update access stats
-                    entry.access_count += 1
-                    entry.last_accessed = datetime.now()
-                    results.append((entry, similarity))
-
-            # Sort by similarity
-            results.sort(key=lambda x: x[1], reverse=True)
-            return results[:top_k]
+            query_vector = _normalize(_encode_query(self.embeddings_model, query))
+            if filter_metadata:
+                # Similarity of just the entries that pass the metadata filter;
+                # exact, since the filter could discard every ANN neighbour
+                rows = np.flatnonzero(self._metadata_mask(filter_metadata))
+                scores = self._matrix[rows] @ query_vector
+            else:
+                rows = self._ann_candidates(query_vector, top_k)
+                if rows is not None:
+                    # Exact similarity of the approximate nearest neighbours
+                    scores = self._matrix[rows] @ query_vector
+                else:
+                    # Cosine similarity with every entry at once
+                    scores = self._matrix[: len(self._ids)] @ query_vector
+                    rows = np.arange(len(scores))
+            return self._rank(rows, scores, top_k, threshold, None)
 
         except Exception as e:
             print(f"⚠️  Search failed: {e}")
             return []
 
-    def _cosine_similarity(self, a: np.ndarray, b: np.ndarray) -> float:
-        """Calculate cosine similarity."""
-        return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
+    def search_batch(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        threshold: float = 0.3,
+        filter_metadata: Dict = None,
+    ) -> List[List[Tuple[VectorEntry, float]]]:
+        """Search for several queries with one batched encode and matrix product."""
+        if self._pending:
+            self._add_pending()
+        if not self.embeddings_model or not self.entries or not queries:
+            return [[] for _ in queries]
+
+        try:
+            query_matrix = self.embeddings_model.encode(
+                queries,
+                batch_size=self.add_batch_size,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+            ).astype(np.float32, copy=False)
+            # Cosine similarity of every query with every entry, a row per query
+            scores = query_matrix @ self._matrix[: len(self._ids)].T
+            rows = np.arange(len(self._ids))
+            mask = self._metadata_mask(filter_metadata) if filter_metadata else None
+            return [
+                self._rank(rows, query_scores, top_k, threshold, mask)
+                for query_scores in scores
+            ]
+
+        except Exception as e:
+            print(f"⚠️  Search failed: {e}")
+            return [[] for _ in queries]
 
-    def _save_store(self):
+    def _rank(
+        self,
+        rows: np.ndarray,
+        scores: np.ndarray,
+        top_k: int,
+        threshold: float,
+        mask: Optional[np.ndarray],
+    ) -> List[Tuple[VectorEntry, float]]:
+        """Threshold, filter by a row mask and rank scored rows into results."""
+        if self.precision == "int8":
+            scores = scores / _INT8_SCALE
+        keep = scores >= threshold
+        if mask is not None:
+            keep &= mask[rows]
+        rows, scores = rows[keep], scores[keep]
+
+        # Sort by similarity, keeping insertion order among ties; every row
+        # tied with the cutoff score is a candidate, as argpartition would
+        # pick among those arbitrarily
+        if 0 < top_k < len(rows):
+            cutoff = -np.partition(-scores, top_k - 1)[top_k - 1]
+            top = np.flatnonzero(scores >= cutoff)
+        else:
+            top = np.arange(len(rows))
+        top = top[np.argsort(-scores[top], kind="stable")[:top_k]]
+        results = [(self.entries[self._ids[rows[i]]], float(scores[i])) for i in top]
+
+        # Update access stats of the returned entries; they are saved with
+        # the next write rather than making every search write
+        now = datetime.now()
+        for entry, _ in results:
+            entry.access_count += 1
+            entry.last_accessed = now
+        if results:
+            self._mark_dirty()
+        return results
+
+    def _ann_candidates(
+        self, query_vector: np.ndarray, top_k: int
+    ) -> Optional[np.ndarray]:
+        """
+        Rows of the approximate nearest neighbours of a query, or None when the
+        store is small enough to scan (or hnswlib is not installed).
+
+        More neighbours than top_k are fetched since the threshold applies
+        afterwards.
+        """
+        n = len(self._ids)
+        if n <= self.ann_threshold or _hnswlib() is None:
+            return None
+        if self._ann_index is None:
+            self._ann_index = self._load_ann_index() or self._build_ann_index()
+
+        k = min(n, max(top_k, 1) * 2)
+        self._ann_index.set_ef(max(k, 64))
+        labels, _ = self._ann_index.knn_query(query_vector, k=k)
+        return np.sort(labels[0].astype(np.intp))
+
+    def _build_ann_index(self):
+        """Index every matrix row, labelled by row number."""
+        n = len(self._ids)
+        index = _hnswlib().Index(space="cosine", dim=self._matrix.shape[1])
+        index.init_index(max_elements=max(2 * n, 10000), ef_construction=200, M=16)
+        index.add_items(np.asarray(self._matrix[:n], dtype=np.float32), np.arange(n))
+        return index
+
+    def _load_ann_index(self):
+        """The saved index, if there is one and it covers the current rows."""
+        ann_file = os.path.join(self.cache_dir, "ann_index.bin")
+        if not os.path.exists(ann_file):
+            return None
+
+        n = len(self._ids)
+        try:
+            index = _hnswlib().Index(space="cosine", dim=self._matrix.shape[1])
+            index.load_index(ann_file, max_elements=max(2 * n, 10000))
+        except Exception as e:
+            print(f"⚠️  Failed to load ANN index: {e}")
+            return None
+        return index if index.get_current_count() == n else None
+
+    def _metadata_mask(self, filter_metadata: Dict) -> np.ndarray:
+        """Rows whose metadata has every filtered key equal to its value."""
+        n = len(self._ids)
+        mask = np.ones(n, dtype=bool)
+        for key, value in filter_metadata.items():
+            column = self._meta_columns.get(key)
+            if column is None:
+                # No entry has the key, so it reads as None everywhere
+                if value is not None:
+                    return np.zeros(n, dtype=bool)
+                continue
+            if value is None or isinstance(value, (str, int, float)):
+                mask &= column[:n] == value
+            else:
+                # Compare sequences and other values one by one, as a whole
+                mask &= np.fromiter((v == value for v in column[:n]), bool, n)
+        return mask
+
+    def _set_metadata_row(self, row: int, metadata: Dict[str, Any]):
+        """Record an entry's metadata values in the per-key columns."""
+        for key in metadata:
+            if key not in self._meta_columns:
+                self._meta_columns[key] = np.empty(len(self._matrix), dtype=object)
+        for key, column in self._meta_columns.items():
+            if row >= len(column):
+                column = self._meta_columns[key] = _ensure_capacity(column, row + 1)
+            column[row] = metadata.get(key)
+
+    def _add_entry(self, entry: VectorEntry):
+        """Store an entry and put its normalized vector in its matrix row."""
+        self.entries[entry.id] = entry
+        row = self._rows.get(entry.id)
+        if row is None:
+            row = len(self._ids)
+            self._ids.append(entry.id)
+            self._rows[entry.id] = row
+            self._matrix = _ensure_capacity(self._matrix, row + 1)
+        if not self._matrix.flags.writeable:
+            self._matrix = np.array(self._matrix)  # copy the loaded memory map
+        vector = _normalize(entry.vector)
+        if self.precision == "int8":
+            vector = np.round(vector * _INT8_SCALE)
+        self._matrix[row] = vector
+        self._set_metadata_row(row, entry.metadata)
+
+        if self._ann_index is not None:
+            if row >= self._ann_index.get_max_elements():
+                self._ann_index.resize_index(2 * row)
+            self._ann_index.add_items(vector[np.newaxis], [row])
+
+    def flush(self):
+        """Embed queued texts, then write pending changes to disk now."""
+        if self._pending:
+            self._add_pending()
+        super().flush()
+
+    def _save_now(self):
         """Save vector store to disk."""
         os.makedirs(self.cache_dir, exist_ok=True)
 
-        # Save metadata
+        # Save metadata, in matrix row order
         metadata = {
             id: {
                 "text": entry.text,
@@ -126,51 +364,98 @@ class VectorStore:
             for id, entry in self.entries.items()
         }
 
-        with open(os.path.join(self.cache_dir, "metadata.json"), "w") as f:
-            json.dump(metadata, f, indent=2)
-
-        # Save vectors
-        vectors = {id: entry.vector.tolist() for id, entry in self.entries.items()}
-        with open(os.path.join(self.cache_dir, "vectors.json"), "w") as f:
-            json.dump(vectors, f)
+        write_json_atomic(os.path.join(self.cache_dir, "metadata.json"), metadata)
+
+        # Save vectors as one binary matrix; it is replaced rather than
+        # overwritten since the previous file may still be memory-mapped
+        matrix_file = os.path.join(self.cache_dir, "vectors.npy")
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, self._matrix[: len(self._ids)])
+        os.replace(tmp_path, matrix_file)
+        if self._ids:
+            # Search the saved file through the page cache, shared with other
+            # processes mapping it, instead of a private copy; the next add
+            # copies it again. Saves run on the mutating caller's thread, so
+            # no add can be writing to the matrix being swapped out
+            self._matrix = np.load(matrix_file, mmap_mode="r")
+
+        legacy_vectors_file = os.path.join(self.cache_dir, "vectors.json")
+        if os.path.exists(legacy_vectors_file):
+            os.remove(legacy_vectors_file)
+
+        # Save the ANN index next to the rows it labels, if one was built; an
+        # older saved index may label rows whose vectors have since changed
+        ann_file = os.path.join(self.cache_dir, "ann_index.bin")
+        if self._ann_index is not None:
+            self._ann_index.save_index(ann_file + ".tmp")
+            os.replace(ann_file + ".tmp", ann_file)
+        elif os.path.exists(ann_file):
+            os.remove(ann_file)
+
+    @staticmethod
+    def _entry_from_meta(id: str, meta: Dict[str, Any], vector) -> VectorEntry:
+        """Build an entry from its saved metadata and vector."""
+        return VectorEntry(
+            id=id,
+            text=meta["text"],
+            vector=vector,
+            metadata=meta["metadata"],
+            created_at=datetime.fromisoformat(meta["created_at"]),
+            access_count=meta["access_count"],
+            last_accessed=(
+                datetime.fromisoformat(meta["last_accessed"])
+                if meta["last_accessed"]
+                else None
+            ),
+        )
 
     def _load_store(self):
         """Load vector store from disk."""
-        metadata_file = os.path.join(self.cache_dir, "metadata.json")
+        matrix_file = os.path.join(self.cache_dir, "vectors.npy")
         vectors_file = os.path.join(self.cache_dir, "vectors.json")
 
-        if not os.path.exists(metadata_file) or not os.path.exists(vectors_file):
-            return
-
         try:
-            with open(metadata_file, "r") as f:
-                metadata = json.load(f)
-
-            with open(vectors_file, "r") as f:
-                vectors = json.load(f)
-
-            for id, meta in metadata.items():
-                if id in vectors:
-                    entry = VectorEntry(
-                        id=id,
-                        text=meta["text"],
-                        vector=np.array(vectors[id]),
-                        metadata=meta["metadata"],
-                        created_at=datetime.fromisoformat(meta["created_at"]),
-                        access_count=meta["access_count"],
-                        last_accessed=(
-                            datetime.fromisoformat(meta["last_accessed"])
-                            if meta["last_accessed"]
-                            else None
-                        ),
-                    )
-                    self.entries[id] = entry
+            metadata = read_json(os.path.join(self.cache_dir, "metadata.json"))
+            if not metadata:
+                return
+
+            if os.path.exists(matrix_file):
+                # Rows are normalized and in metadata order, so a memory-mapped
+                # matrix of this store's precision is used as is until the first
+                # write copies it; one saved at another precision is converted
+                matrix = np.load(matrix_file, mmap_mode="r")
+                entries = [
+                    self._entry_from_meta(id, meta, vector)
+                    for (id, meta), vector in zip(metadata.items(), matrix)
+                ]
+                if matrix.dtype == self._matrix.dtype:
+                    self.entries = {entry.id: entry for entry in entries}
+                    self._ids = list(self.entries)
+                    self._rows = {id: row for row, id in enumerate(self._ids)}
+                    self._matrix = matrix
+                    for row, entry in enumerate(entries):
+                        self._set_metadata_row(row, entry.metadata)
+                else:
+                    for entry in entries:
+                        self._add_entry(entry)
+            elif os.path.exists(vectors_file):
+                # Vectors saved as JSON lists by older versions
+                with open(vectors_file, "r") as f:
+                    vectors = json.load(f)
+
+                for id, meta in metadata.items():
+                    if id in vectors:
+                        vector = np.array(vectors[id])
+                        self._add_entry(self._entry_from_meta(id, meta, vector))
 
         except Exception as e:
             print(f"⚠️  Failed to load vector store: {e}")
 
     def get_stats(self) -> Dict[str, Any]:
         """Get vector store statistics."""
+        if self._pending:
+            self._add_pending()
         if not self.entries:
             return {
                 "total_entries": 0,
@@ -190,5 +475,11 @@ class VectorStore:
 
     def clear(self):
         """Clear all entries."""
+        self._pending.clear()
         self.entries.clear()
-        self._save_store()
+        self._ids.clear()
+        self._rows.clear()
+        self._meta_columns.clear()
+        self._ann_index = None
+        self._save()
+        self.flush()  # Clearing is written through
@@ -18,7 +18,10 @@ class ConfigManager:
     def __init__(self, config_file: str = "config/config.yaml"):
         self.config_file = config_file
         self.config: Dict[str, Any] = {}
+        # Every dotted key path -> its value, so get() is a single lookup
+        self._flat: Dict[str, Any] = {}
         self._load_config()
+        self._flat = self._flatten(self.config)
 
     def _load_config(self):
         """Load configuration from file."""
@@ -72,20 +75,21 @@ class ConfigManager:
             },
         }
 
-    def get(self, key: str, default: Any = None) -> Any:
-        """Get configuration value."""
-        keys = key.split(".")
-        value = self.config
-
-        for k in keys:
+    @classmethod
+    def _flatten(cls, config: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+        """Map each dotted key path, including nested sections, to its value."""
+        flat = {}
+        for k, value in config.items():
+            path = f"{prefix}{k}"
+            flat[path] = value
             if isinstance(value, dict):
-                value = value.get(k)
-                if value is None:
-                    return default
-            else:
-                return default
+                flat.update(cls._flatten(value, path + "."))
+        return flat
 
-        return value
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get configuration value."""
+        value = self._flat.get(key)
+        return default if value is None else value
 
     def set(self, key: str, value: Any):
         """Set configuration value."""
@@ -98,23 +102,29 @@ class ConfigManager:
             config = config[k]
 
         config[keys[-1]] = value
+        self._flat = self._flatten(self.config)
 
     def save(self):
         """Save configuration to file."""
         os.makedirs(os.path.dirname(self.config_file), exist_ok=True)
 
         try:
-            with open(self.config_file, "w") as f:
-                if self.config_file.endswith(".yaml") or self.config_file.endswith(
-                    ".yml"
-                ):
-                    if yaml is None:
-                        print("⚠️  PyYAML not installed. Saving as JSON instead.")
-                        json.dump(self.config, f, indent=2)
-                    else:
-                        yaml.dump(self.config, f, default_flow_style=False)
-                elif self.config_file.endswith(".json"):
-                    json.dump(self.config, f, indent=2)
+            if self.config_file.endswith((".yaml", ".yml")):
+                if yaml is None:
+                    print("⚠️  PyYAML not installed. Saving as JSON instead.")
+                    payload = json.dumps(self.config, indent=2)
+                else:
+                    payload = yaml.dump(self.config, default_flow_style=False)
+            elif self.config_file.endswith(".json"):
+                payload = json.dumps(self.config, indent=2)
+            else:
+                payload = ""
+
+            # Replace the file in one rename so a failed save keeps the old one
+            tmp_file = self.config_file + ".tmp"
+            with open(tmp_file, "w") as f:
+                f.write(payload)
+            os.replace(tmp_file, self.config_file)
         except Exception as e:
             print(f"❌ Failed to save config: {e}")
 
@@ -6,42 +6,121 @@ from __future__ import annotations
 
 import json
 import os
+import shutil
 import sys
+import tempfile
 from typing import Any, Dict, Optional, Tuple
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Project paths, resolved once at import
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_OPENCODE_PLUGIN_DIR = os.path.normpath(
+    os.path.join(_HERE, "..", "..", "opencode-plugin")
+)
+_OLD_PLUGIN_DIR = os.path.normpath(os.path.join(_HERE, "..", "..", "plugin"))
+_MCP_SERVER = os.path.normpath(os.path.join(_HERE, "..", "..", "mcp_server.py"))
+
+
+def _loads(raw: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _dumps(data: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, indent=2).encode("utf-8")
+
 
 def _load_json(path: str, default: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-    if not os.path.exists(path):
-        return default or {}
+    # One open and one read hand the parser the whole file; a missing file
+    # fails the open like any unreadable one
     try:
-        with open(path, "r") as f:
-            return json.load(f)
+        with open(path, "rb") as f:
+            return _loads(f.read())
     except Exception:
         return default or {}
 
 
+def _json_get_path(path: str, *keys: str) -> Any:
+    """The value under a key path of a JSON file, or None if it has none."""
+    value: Any = _load_json(path)
+    for key in keys:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
 def _save_json(path: str, data: Dict[str, Any]) -> None:
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "w") as f:
-        json.dump(data, f, indent=2)
+    # Write a temp file and rename it over the config, so a crash mid-write
+    # never leaves the user's config truncated
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    payload = _dumps(data)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates the file 0600; keep the config's own permissions
+        if os.path.exists(path):
+            shutil.copymode(path, tmp_path)
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmp_path, 0o666 & ~umask)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+    _fsync_dir(directory)
+
+
+def _fsync_dir(directory: str) -> None:
+    """Persist a rename in directory (a no-op where directories can't be opened)."""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    try:
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
 
 
 def _expand(path: str) -> str:
     return os.path.expanduser(path)
 
 
+# Config locations depend only on the platform and home directory
+_OPENCODE_CONFIG_PATH = _expand("~/.config/opencode/opencode.json")
+if sys.platform == "darwin":
+    _CLAUDE_CONFIG_PATH = _expand(
+        "~/Library/Application Support/Claude/claude_desktop_config.json"
+    )
+elif sys.platform.startswith("linux"):
+    _CLAUDE_CONFIG_PATH = _expand("~/.config/Claude/claude_desktop_config.json")
+else:
+    _CLAUDE_CONFIG_PATH = _expand("~/.claude/claude_desktop_config.json")
+
+
 def get_opencode_config_path() -> str:
-    return _expand("~/.config/opencode/opencode.json")
+    return _OPENCODE_CONFIG_PATH
 
 
 def get_claude_desktop_config_path() -> str:
-    if sys.platform == "darwin":
-        return _expand(
-            "~/Library/Application Support/Claude/claude_desktop_config.json"
-        )
-    if sys.platform.startswith("linux"):
-        return _expand("~/.config/Claude/claude_desktop_config.json")
-    return _expand("~/.claude/claude_desktop_config.json")
+    return _CLAUDE_CONFIG_PATH
 
 
 def install_opencode_plugin(plugin_name: str = "sage-agent") -> Tuple[bool, str]:
@@ -49,9 +128,7 @@ def install_opencode_plugin(plugin_name: str = "sage-agent") -> Tuple[bool, str]
     config = _load_json(config_path, default={"plugin": []})
 
     # Get the absolute path to the TypeScript plugin directory (only this one!)
-    opencode_plugin_dir = os.path.abspath(
-        os.path.join(os.path.dirname(__file__), "..", "..", "opencode-plugin")
-    )
+    opencode_plugin_dir = _OPENCODE_PLUGIN_DIR
     opencode_plugin_manifest = os.path.join(opencode_plugin_dir, "package.json")
 
     # Verify plugin manifest exists
@@ -61,12 +138,9 @@ def install_opencode_plugin(plugin_name: str = "sage-agent") -> Tuple[bool, str]
     plugins = config.get("plugin", [])
     
     # Remove old sage-agent entries (plugin name and old paths)
-    old_plugin_dir = os.path.abspath(
-        os.path.join(os.path.dirname(__file__), "..", "..", "plugin")
-    )
     plugins = [
         p for p in plugins 
-        if p not in (plugin_name, old_plugin_dir, opencode_plugin_dir)
+        if p not in (plugin_name, _OLD_PLUGIN_DIR, opencode_plugin_dir)
     ]
 
     # Add only the TypeScript plugin directory
@@ -83,18 +157,14 @@ def uninstall_opencode_plugin(plugin_name: str = "sage-agent") -> Tuple[bool, st
     config = _load_json(config_path, default={})
 
     # Get the absolute path to the TypeScript plugin directory
-    opencode_plugin_dir = os.path.abspath(
-        os.path.join(os.path.dirname(__file__), "..", "..", "opencode-plugin")
-    )
+    opencode_plugin_dir = _OPENCODE_PLUGIN_DIR
 
+    # Edit the list in place, and only when the plugin is actually in it
     changed = False
     plugins = config.get("plugin")
-    if isinstance(plugins, list):
-        original_len = len(plugins)
-        plugins = [p for p in plugins if p != opencode_plugin_dir]
-        if len(plugins) < original_len:
-            config["plugin"] = plugins
-            changed = True
+    if isinstance(plugins, list) and opencode_plugin_dir in plugins:
+        plugins[:] = [p for p in plugins if p != opencode_plugin_dir]
+        changed = True
 
     if changed:
         _save_json(config_path, config)
@@ -114,7 +184,7 @@ def install_claude_mcp(
 
     # Get absolute paths
     python_executable = python_path or sys.executable
-    mcp_server_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "mcp_server.py"))
+    mcp_server_path = _MCP_SERVER
     project_dir = os.path.dirname(mcp_server_path)
     
     # Verify MCP server exists
@@ -154,16 +224,12 @@ def doctor() -> Dict[str, Any]:
     opencode_path = get_opencode_config_path()
     claude_path = get_claude_desktop_config_path()
 
-    opencode_config = _load_json(opencode_path, default={})
-    claude_config = _load_json(claude_path, default={})
-
-    opencode_plugins = opencode_config.get("plugin") or []
-    claude_mcps = claude_config.get("mcpServers", {})
+    # Only the two registrations are needed, not the rest of either config
+    opencode_plugins = _json_get_path(opencode_path, "plugin") or []
+    claude_mcps = _json_get_path(claude_path, "mcpServers") or {}
 
     # Get the TypeScript plugin directory path
-    opencode_plugin_dir = os.path.abspath(
-        os.path.join(os.path.dirname(__file__), "..", "..", "opencode-plugin")
-    )
+    opencode_plugin_dir = _OPENCODE_PLUGIN_DIR
 
     # Check if plugin is registered
     opencode_registered = (
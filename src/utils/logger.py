@@ -2,12 +2,20 @@
 Logging configuration for Sage Agent system.
 """
 
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
 from typing import Optional
 
-
-_loggers = {}
+# One formatter and console handler shared by every logger using the default
+# format; the logger's own level does the filtering
+_DEFAULT_FORMATTER = logging.Formatter(
+    "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+_SHARED_CONSOLE_HANDLER = logging.StreamHandler()
+_SHARED_CONSOLE_HANDLER.setFormatter(_DEFAULT_FORMATTER)
 
 
 def setup_logger(
@@ -17,39 +25,42 @@ def setup_logger(
     format_string: Optional[str] = None,
 ) -> logging.Logger:
     """Set up logger."""
+    logger = logging.getLogger(name)
 
-    if name in _loggers:
-        return _loggers[name]
+    # logging keeps one logger per name; if it has handlers it is set up
+    if logger.handlers:
+        return logger
 
-    logger = logging.getLogger(name)
     logger.setLevel(getattr(logging, level.upper()))
 
-    # Console handler
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(getattr(logging, level.upper()))
-
-    # Formatter
+    # Formatter and console handler
     if format_string is None:
-        format_string = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-
-    formatter = logging.Formatter(format_string)
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+        formatter = _DEFAULT_FORMATTER
+        logger.addHandler(_SHARED_CONSOLE_HANDLER)
+    else:
+        formatter = logging.Formatter(format_string)
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(getattr(logging, level.upper()))
+        console_handler.setFormatter(formatter)
+        logger.addHandler(console_handler)
 
-    # File handler
+    # File handler, fed through a queue so logging never waits on the disk;
+    # a listener thread does the writes and is drained at exit
     if log_file:
         os.makedirs(os.path.dirname(log_file), exist_ok=True)
         file_handler = logging.FileHandler(log_file)
         file_handler.setLevel(getattr(logging, level.upper()))
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
 
-    _loggers[name] = logger
+        records: queue.Queue = queue.Queue(-1)
+        listener = logging.handlers.QueueListener(records, file_handler)
+        listener.start()
+        atexit.register(listener.stop)
+        logger.addHandler(logging.handlers.QueueHandler(records))
+
     return logger
 
 
 def get_logger(name: str) -> logging.Logger:
     """Get logger."""
-    if name not in _loggers:
-        return setup_logger(name)
-    return _loggers[name]
+    return setup_logger(name)
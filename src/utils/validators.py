@@ -4,6 +4,12 @@ Validation utilities for Sage Agent system.
 
 from typing import Dict, Any, List, Tuple
 
+# Field tables, built once; required fields stay ordered for the error list
+_AGENT_REQUIRED = ("name", "role", "goal", "backstory")
+_TASK_REQUIRED = ("description", "agent", "expected_output")
+_VALID_AGENT_TYPES = ("manager", "specialist")
+_VALID_PROVIDERS = ("openai", "anthropic", "local", "groq", "cohere", "mistral")
+
 
 def validate_prompt(
     prompt: str, min_length: int = 1, max_length: int = 10000
@@ -12,30 +18,36 @@ def validate_prompt(
     if not prompt:
         return False, "Prompt cannot be empty"
 
-    if len(prompt) < min_length:
-        return False, f"Prompt must be at least {min_length} characters"
+    # One chained comparison settles the common in-range case
+    length = len(prompt)
+    if min_length <= length <= max_length:
+        return True, "Valid"
 
-    if len(prompt) > max_length:
-        return False, f"Prompt must be at most {max_length} characters"
+    if length < min_length:
+        return False, f"Prompt must be at least {min_length} characters"
 
-    return True, "Valid"
+    return False, f"Prompt must be at most {max_length} characters"
 
 
 def validate_agent_config(config: Dict[str, Any]) -> Tuple[bool, List[str]]:
     """Validate agent configuration."""
     errors = []
 
-    required_fields = ["name", "role", "goal", "backstory"]
-    for field in required_fields:
+    for field in _AGENT_REQUIRED:
+        # One lookup settles the usual present, non-empty string case
+        value = config.get(field)
+        if isinstance(value, str) and value.strip():
+            continue
         if field not in config:
             errors.append(f"Missing required field: {field}")
-        elif not isinstance(config[field], str) or not config[field].strip():
+        else:
             errors.append(f"Field '{field}' must be a non-empty string")
 
     if "agent_type" in config:
-        valid_types = ["manager", "specialist"]
-        if config["agent_type"] not in valid_types:
-            errors.append(f"Invalid agent_type. Must be one of: {valid_types}")
+        if config["agent_type"] not in _VALID_AGENT_TYPES:
+            errors.append(
+                f"Invalid agent_type. Must be one of: {list(_VALID_AGENT_TYPES)}"
+            )
 
     if "tools" in config:
         if not isinstance(config["tools"], list):
@@ -48,8 +60,7 @@ def validate_task_config(config: Dict[str, Any]) -> Tuple[bool, List[str]]:
     """Validate task configuration."""
     errors = []
 
-    required_fields = ["description", "agent", "expected_output"]
-    for field in required_fields:
+    for field in _TASK_REQUIRED:
         if field not in config:
             errors.append(f"Missing required field: {field}")
 
@@ -71,9 +82,8 @@ def validate_llm_config(config: Dict[str, Any]) -> Tuple[bool, List[str]]:
     if "provider" not in config:
         errors.append("Missing required field: provider")
     else:
-        valid_providers = ["openai", "anthropic", "local", "groq", "cohere", "mistral"]
-        if config["provider"] not in valid_providers:
-            errors.append(f"Invalid provider. Must be one of: {valid_providers}")
+        if config["provider"] not in _VALID_PROVIDERS:
+            errors.append(f"Invalid provider. Must be one of: {list(_VALID_PROVIDERS)}")
 
     if "model" not in config:
         errors.append("Missing required field: model")
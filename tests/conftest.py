@@ -0,0 +1,43 @@
+"""Shared fixtures: a small deterministic stand-in for the embeddings model."""
+
+import zlib
+
+import numpy as np
+import pytest
+
+from src.rlm import engine, vector_store
+
+DIMENSION = 16
+
+
+class StubModel:
+    """Embeds text as a bag of hashed words, so shared words mean similarity."""
+
+    def encode(self, texts, **kwargs):
+        if isinstance(texts, str):
+            return self._embed(texts)
+        return np.stack([self._embed(text) for text in texts])
+
+    @staticmethod
+    def _embed(text):
+        vector = np.zeros(DIMENSION, dtype=np.float32)
+        for word in text.lower().split():
+            vector[zlib.crc32(word.encode()) % DIMENSION] += 1.0
+        return vector / (np.linalg.norm(vector) + 1e-12)
+
+
+@pytest.fixture
+def stub_model(monkeypatch):
+    model = StubModel()
+    monkeypatch.setattr(engine, "_get_st_model", lambda *args: model)
+    monkeypatch.setattr(vector_store, "_get_st_model", lambda *args: model)
+    return model
+
+
+@pytest.fixture
+def no_model(monkeypatch):
+    def missing(*args):
+        raise ImportError("sentence-transformers not installed")
+
+    monkeypatch.setattr(engine, "_get_st_model", missing)
+    monkeypatch.setattr(vector_store, "_get_st_model", missing)
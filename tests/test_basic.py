@@ -0,0 +1,177 @@
+"""Smoke tests: plugin layout, module importability and the HTTP server."""
+
+import http.client
+import importlib.util
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PLUGIN_FILES = (
+    "opencode-plugin/README.md",
+    "opencode-plugin/src/index.ts",
+    "opencode-plugin/src/types.ts",
+)
+
+# Generous, since startup may load the embeddings model; polling returns as
+# soon as the server accepts connections
+SERVER_STARTUP_TIMEOUT = 60.0
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(cwd: str, port: int) -> subprocess.Popen:
+    """Start the HTTP server, keeping its caches under cwd."""
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "src.http_server:app",
+            "--app-dir",
+            ROOT,
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+        ],
+        cwd=cwd,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_until_ready(process: subprocess.Popen, port: int) -> bool:
+    """Poll until the server accepts connections; False if it exits or times out."""
+    deadline = time.monotonic() + SERVER_STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            return False
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.1):
+                return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+
+@pytest.fixture(scope="module")
+def server(tmp_path_factory):
+    pytest.importorskip("uvicorn")
+    port = _free_port()
+    process = start_server(str(tmp_path_factory.mktemp("server")), port)
+    try:
+        yield process, port
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def test_plugin_structure():
+    missing = [
+        path for path in PLUGIN_FILES if not os.path.exists(os.path.join(ROOT, path))
+    ]
+    assert not missing
+
+
+@pytest.fixture(scope="module")
+def connection(server):
+    """One connection to the server, shared by the endpoint tests."""
+    process, port = server
+    if not wait_until_ready(process, port):
+        pytest.fail("HTTP server did not start")
+    shared = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    yield shared
+    shared.close()
+
+
+def get_json(connection: http.client.HTTPConnection, path: str):
+    """GET path on a kept-alive connection and decode the JSON reply."""
+    connection.request("GET", path)
+    response = connection.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def test_imports():
+    # Locating the modules is enough; importing them would run their setup
+    for name in ("src.rlm", "src.http_server"):
+        assert importlib.util.find_spec(name) is not None
+
+
+def test_http_server_startup(server):
+    process, port = server
+    assert wait_until_ready(process, port)
+    assert process.poll() is None
+
+
+def test_health_endpoint(connection):
+    status, data = get_json(connection, "/health")
+    assert status == 200
+    assert data["status"] == "healthy"
+
+    # A second request reuses the same connection
+    sock = connection.sock
+    assert get_json(connection, "/health")[0] == 200
+    assert connection.sock is sock
+
+
+def _passes(test, *args) -> bool:
+    try:
+        test(*args)
+    except Exception as e:
+        print(f"❌ {test.__name__}: {e!r}")
+        return False
+    return True
+
+
+def run_tests() -> bool:
+    """Run the smoke tests without pytest, overlapping the server startup."""
+    port = _free_port()
+    with tempfile.TemporaryDirectory() as cwd:
+        process = start_server(cwd, port)
+        try:
+            # The file checks run while the server starts; the endpoint test
+            # needs the server, so it runs once startup has finished
+            with ThreadPoolExecutor(max_workers=3) as pool:
+                futures = {
+                    "plugin structure": pool.submit(_passes, test_plugin_structure),
+                    "imports": pool.submit(_passes, test_imports),
+                    "server startup": pool.submit(wait_until_ready, process, port),
+                }
+                results = {name: future.result() for name, future in futures.items()}
+
+            if results["server startup"]:
+                shared = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+                try:
+                    results["health endpoint"] = _passes(test_health_endpoint, shared)
+                finally:
+                    shared.close()
+            else:
+                results["health endpoint"] = False
+        finally:
+            process.terminate()
+            process.wait(timeout=10)
+
+    for name, passed in results.items():
+        print(f"{'✅' if passed else '❌'} {name}")
+    return all(results.values())
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, ROOT)
+    sys.exit(0 if run_tests() else 1)
@@ -0,0 +1,89 @@
+"""Tests for RLMCache's append-only log."""
+
+import json
+import os
+from datetime import datetime, timedelta
+
+from src.rlm.cache import RLMCache, _query_hash
+
+
+def _log_lines(cache):
+    with open(cache.log_file) as f:
+        return [line for line in f if line.strip()]
+
+
+def test_round_trip(tmp_path):
+    cache = RLMCache(cache_dir=str(tmp_path))
+    long_response = "word " * 500
+    cache.set("short", "plain answer", tokens_saved=3, metadata={"k": "v"})
+    cache.set("long", long_response)
+
+    loaded = RLMCache(cache_dir=str(tmp_path))
+    assert loaded.get("short").response == "plain answer"
+    assert loaded.get("short").metadata == {"k": "v"}
+    assert loaded.get("long").response == long_response
+    assert loaded.cache[loaded._get_query_hash("long")].compressed
+
+
+def test_eviction_is_logged(tmp_path):
+    cache = RLMCache(cache_dir=str(tmp_path), max_size=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")  # b is now least recently used
+    cache.set("c", "3")
+
+    assert cache.get("b") is None
+    loaded = RLMCache(cache_dir=str(tmp_path), max_size=2)
+    assert loaded.get("b") is None
+    assert loaded.get("a").response == "1"
+    assert loaded.get("c").response == "3"
+
+
+def test_log_is_compacted(tmp_path):
+    cache = RLMCache(cache_dir=str(tmp_path))
+    for i in range(20):
+        cache.set("same query", f"answer {i}")
+
+    assert len(_log_lines(cache)) <= 2
+    loaded = RLMCache(cache_dir=str(tmp_path))
+    assert len(loaded.cache) == 1
+    assert loaded.get("same query").response == "answer 19"
+
+
+def test_expired_entries_are_dropped(tmp_path):
+    cache = RLMCache(cache_dir=str(tmp_path), ttl_hours=1)
+    cache.set("old", "stale")
+    cache.set("new", "fresh")
+    old = cache.cache[cache._get_query_hash("old")]
+    old.timestamp = datetime.now() - timedelta(hours=2)
+    assert cache.prune_expired() == 1
+
+    loaded = RLMCache(cache_dir=str(tmp_path), ttl_hours=1)
+    assert loaded.get("old") is None
+    assert loaded.get("new").response == "fresh"
+
+
+def test_legacy_snapshot_is_migrated(tmp_path):
+    key = _query_hash("legacy query")
+    legacy = {
+        key: {
+            "query_hash": key,
+            "query": "legacy query",
+            "response": "legacy answer",
+            "tokens_saved": 7,
+            "timestamp": datetime.now().isoformat(),
+            "metadata": {},
+            "compressed": False,
+        }
+    }
+    os.makedirs(tmp_path / "cache")
+    with open(tmp_path / "cache" / "cache.json", "w") as f:
+        json.dump(legacy, f)
+
+    migrated = RLMCache(cache_dir=str(tmp_path / "cache"))
+    assert migrated.get("legacy query").tokens_saved == 7
+    assert not os.path.exists(tmp_path / "cache" / "cache.json")
+    assert len(_log_lines(migrated)) == 1
+
+    loaded = RLMCache(cache_dir=str(tmp_path / "cache"))
+    assert loaded.get("legacy query").response == "legacy answer"
@@ -0,0 +1,39 @@
+"""Tests for ContextRetriever's bounded memory."""
+
+import pytest
+
+from src.rlm.engine import ContextRetriever
+
+
+def _keys(retriever):
+    return sorted(item["key"] for item in retriever.memory_store)
+
+
+@pytest.mark.parametrize("embedded", [False, True])
+def test_least_used_items_are_evicted(request, embedded):
+    request.getfixturevalue("stub_model" if embedded else "no_model")
+    retriever = ContextRetriever(max_items=3)
+    assert retriever.use_embeddings is embedded
+
+    retriever.add_to_memory("apple", "apple pie recipe")
+    retriever.add_to_memory("banana", "banana bread recipe")
+    retriever.add_to_memory("cherry", "cherry tart recipe")
+    assert "banana" in retriever.retrieve_relevant_context("banana bread", top_k=1)
+
+    retriever.add_many(
+        [
+            {"key": "date", "content": "date cake recipe"},
+            {"key": "elder", "content": "elderflower cordial recipe"},
+        ]
+    )
+    assert _keys(retriever) == ["banana", "date", "elder"]
+    assert len(retriever._token_sets) == 3
+
+    context = retriever.retrieve_relevant_context("date cake", top_k=1)
+    assert "date cake" in context
+    if embedded:
+        assert retriever._emb_rows == [0, 1, 2]
+        semantic = retriever.retrieve_relevant_context(
+            "elderflower cordial", top_k=1, strategy="semantic"
+        )
+        assert "elderflower" in semantic
@@ -0,0 +1,68 @@
+"""Tests for KnowledgeBase indexing and persistence."""
+
+from src.rlm.knowledge_base import KnowledgeBase
+
+
+def _ids(entries):
+    return [entry.id for entry in entries]
+
+
+def test_delete_keeps_insertion_order(tmp_path):
+    kb = KnowledgeBase(storage_dir=str(tmp_path))
+    for i in range(6):
+        kb.add(f"k{i}", "notes", f"title {i}", "same body", tags=["t"], priority=5)
+
+    assert kb.delete("k1")
+    assert kb.delete("k4")
+    assert not kb.delete("k4")
+
+    expected = ["k0", "k2", "k3", "k5"]
+    assert _ids(kb.search(limit=10)) == expected
+    assert _ids(kb.get_by_category("notes")) == expected
+    assert _ids(kb.get_by_tag("t")) == expected
+    assert _ids(kb.search(query="title 5")) == ["k5"]
+
+    kb.add("k6", "notes", "title 6", "same body", tags=["t"], priority=5)
+    assert _ids(kb.search(limit=10)) == expected + ["k6"]
+
+
+def test_search_ranks_by_priority_then_access(tmp_path):
+    kb = KnowledgeBase(storage_dir=str(tmp_path))
+    kb.add("low", "c", "low", "body", priority=1)
+    kb.add("high", "c", "high", "body", priority=9)
+    kb.add("mid", "c", "mid", "body", priority=5)
+    kb.add("mid2", "c", "mid2", "body", priority=5)
+    kb.get("mid2")
+
+    assert _ids(kb.search()) == ["high", "mid2", "mid", "low"]
+    assert _ids(kb.search(min_priority=5, limit=2)) == ["high", "mid2"]
+
+
+def test_round_trip(tmp_path):
+    kb = KnowledgeBase(storage_dir=str(tmp_path))
+    kb.add("a", "c1", "Alpha", "first", tags=["x"], priority=3)
+    kb.add("b", "c2", "Beta", "second", tags=["x", "y"], priority=7)
+    kb.add("c", "c1", "Gamma", "third", priority=3)
+    kb.delete("c")
+    kb.get("a")
+    kb.flush()
+
+    loaded = KnowledgeBase(storage_dir=str(tmp_path))
+    assert list(loaded.entries) == ["a", "b"]
+    assert loaded.entries["a"].access_count == 1
+    assert loaded.entries["b"].tags == ["x", "y"]
+    assert _ids(loaded.get_by_tag("x")) == ["a", "b"]
+    assert _ids(loaded.search()) == ["b", "a"]
+
+
+def test_delete_is_deferred_like_other_changes(tmp_path):
+    kb = KnowledgeBase(storage_dir=str(tmp_path))
+    kb.flush_interval = 3600.0
+    kb.add("a", "c", "Alpha", "first")
+    kb.add("b", "c", "Beta", "second")
+    kb.flush()
+
+    kb.delete("a")
+    assert list(KnowledgeBase(storage_dir=str(tmp_path)).entries) == ["a", "b"]
+    kb.flush()
+    assert list(KnowledgeBase(storage_dir=str(tmp_path)).entries) == ["b"]
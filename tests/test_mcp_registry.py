@@ -0,0 +1,40 @@
+"""Tests for MCPRegistry persistence and search."""
+
+import json
+
+from src.opencode.mcp_registry import EXAMPLE_TEMPLATES, MCPRegistry
+
+
+def test_round_trip_uses_flat_template_list(tmp_path):
+    registry = MCPRegistry(storage_dir=str(tmp_path))
+    assert registry.import_template(EXAMPLE_TEMPLATES["github"])
+    assert registry.import_template(EXAMPLE_TEMPLATES["filesystem"])
+
+    with open(tmp_path / "registry.json") as f:
+        data = json.load(f)
+    assert data["version"] == 2
+    assert [t["name"] for t in data["templates"]] == ["github", "filesystem"]
+
+    loaded = MCPRegistry(storage_dir=str(tmp_path))
+    assert [s.name for s in loaded.list_all()] == ["github", "filesystem"]
+    assert loaded.export_template("github") == registry.export_template("github")
+    assert [s.name for s in loaded.search("github repos")] == ["github"]
+
+
+def test_version_1_file_is_read_and_rewritten(tmp_path):
+    templates = {name: EXAMPLE_TEMPLATES[name] for name in ("github", "postgres")}
+    with open(tmp_path / "registry.json", "w") as f:
+        json.dump({"templates": templates}, f)
+
+    registry = MCPRegistry(storage_dir=str(tmp_path))
+    assert [s.name for s in registry.list_all()] == ["github", "postgres"]
+    assert [s.name for s in registry.search("postgresql")] == ["postgres"]
+
+    registry.unregister("github")
+    with open(tmp_path / "registry.json") as f:
+        data = json.load(f)
+    assert data == {
+        "version": 2,
+        "templates": [registry.export_template("postgres")],
+    }
+    assert registry.search("github") == []
@@ -0,0 +1,114 @@
+"""Tests for LongTermMemory's JSONL log and legacy migration."""
+
+import json
+import os
+
+from src.rlm.memory import LongTermMemory
+
+
+def _record(id, query, response="answer", **fields):
+    return {
+        "op": "set",
+        "id": id,
+        "timestamp": "2024-01-01T00:00:00",
+        "query": query,
+        "response": response,
+        "context": "",
+        "provider": "openai",
+        "model": "m",
+        "tokens_used": 10,
+        "success": True,
+        **fields,
+    }
+
+
+def _write_log(path, records):
+    with open(path, "w") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+def test_round_trip(tmp_path):
+    memory = LongTermMemory(storage_dir=str(tmp_path))
+    first = memory.remember("how do I sort a list", "use sorted()", provider="openai")
+    second = memory.remember("how do I reverse a list", "use reversed()")
+    memory.flush()
+
+    loaded = LongTermMemory(storage_dir=str(tmp_path))
+    assert list(loaded.memories) == [first, second]
+    assert list(loaded.conversation_history) == [first, second]
+    assert loaded.recall_exact("how do I sort a list").response == "use sorted()"
+    assert loaded.recall("sort a list", limit=1)[0].id == first
+    assert loaded.learned_patterns["sort"]["providers"]["openai"] == 1
+
+
+def test_replayed_duplicate_ids_are_indexed_once(tmp_path):
+    log_file = os.path.join(tmp_path, "memories.jsonl")
+    _write_log(
+        log_file,
+        [
+            _record("m1", "old question"),
+            _record("m1", "new question", response="new answer"),
+        ],
+    )
+
+    memory = LongTermMemory(storage_dir=str(tmp_path))
+    assert memory.recall_exact("old question") is None
+    assert memory.recall_exact("new question").response == "new answer"
+    assert memory.recall("old") == []
+    assert [m.id for m in memory.recall("new question")] == ["m1"]
+
+
+def test_deletions_replay_and_leave_history(tmp_path):
+    memory = LongTermMemory(storage_dir=str(tmp_path))
+    kept = memory.remember("recent question", "answer")
+    old = memory.remember("ancient question", "answer")
+    memory.memories[old].timestamp = memory.memories[old].timestamp.replace(year=2000)
+    assert memory.clear_old_memories(days=30) == 1
+
+    loaded = LongTermMemory(storage_dir=str(tmp_path))
+    assert list(loaded.memories) == [kept]
+    assert list(loaded.conversation_history) == [kept]
+    assert loaded.recall_exact("ancient question") is None
+
+
+def test_log_is_compacted(tmp_path):
+    memory = LongTermMemory(storage_dir=str(tmp_path))
+    ids = [memory.remember(f"question {i}", "answer") for i in range(4)]
+    memory.memories[ids[0]].timestamp = memory.memories[ids[0]].timestamp.replace(
+        year=2000
+    )
+    memory.clear_old_memories(days=30)
+    for i in range(4, 8):
+        memory.remember(f"question {i}", "answer")
+
+    with open(memory.log_file) as f:
+        lines = [line for line in f if line.strip()]
+    assert len(lines) <= 2 * len(memory.memories)
+    loaded = LongTermMemory(storage_dir=str(tmp_path))
+    assert list(loaded.memories) == list(memory.memories)
+
+
+def test_legacy_snapshot_is_migrated(tmp_path):
+    legacy = {
+        id: {
+            k: v
+            for k, v in _record(id, f"legacy {id}").items()
+            if k not in ("op", "id")
+        }
+        for id in ("a", "b")
+    }
+    with open(os.path.join(tmp_path, "memories.json"), "w") as f:
+        json.dump(legacy, f)
+    with open(os.path.join(tmp_path, "history.json"), "w") as f:
+        json.dump(["a", "b"], f)
+
+    memory = LongTermMemory(storage_dir=str(tmp_path))
+    assert list(memory.memories) == ["a", "b"]
+    assert list(memory.conversation_history) == ["a", "b"]
+    assert not os.path.exists(os.path.join(tmp_path, "memories.json"))
+    assert not os.path.exists(os.path.join(tmp_path, "history.json"))
+
+    loaded = LongTermMemory(storage_dir=str(tmp_path))
+    assert list(loaded.memories) == ["a", "b"]
+    assert loaded.recall_exact("legacy b").id == "b"
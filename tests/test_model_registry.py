@@ -0,0 +1,41 @@
+"""Tests for ModelInfo and the model registry."""
+
+from dataclasses import asdict
+
+import pytest
+
+from src.utils.model_registry import ModelInfo, ModelProvider, ModelRegistry
+
+
+def _model(**overrides):
+    fields = dict(
+        name="m",
+        provider=ModelProvider.OPENAI,
+        description="d",
+        context_window=1000,
+        max_tokens=100,
+        cost_per_1k_input=0.5,
+        cost_per_1k_output=1.5,
+    )
+    fields.update(overrides)
+    return ModelInfo(**fields)
+
+
+def test_cost_estimate_follows_price_changes():
+    model = _model()
+    assert model.get_cost_estimate(2000, 1000) == pytest.approx(2.5)
+    model.cost_per_1k_input = 1.0
+    assert model.get_cost_estimate(2000, 1000) == pytest.approx(3.5)
+
+
+def test_model_fields_are_only_the_public_ones():
+    assert "_cost_per_input_token" not in asdict(_model())
+    assert _model() == _model()
+
+
+def test_registries_do_not_share_models():
+    first = ModelRegistry(auto_discover_opencode=False)
+    second = ModelRegistry(auto_discover_opencode=False)
+    name = next(iter(first.models))
+    first.models[name].metadata["note"] = "changed"
+    assert "note" not in second.models[name].metadata
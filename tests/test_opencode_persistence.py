@@ -0,0 +1,24 @@
+"""Tests for the OpenCode JSON file helpers."""
+
+import json
+import shutil
+
+from src.opencode.persistence import write_json
+from src.opencode.session_manager import SessionManager
+
+
+def test_write_json_recreates_removed_directory(tmp_path):
+    path = tmp_path / "gone" / "data.json"
+    write_json(str(path), {"a": 1})
+    assert json.loads(path.read_text()) == {"a": 1}
+
+
+def test_session_saved_after_directory_removed(tmp_path):
+    sessions_dir = tmp_path / "sessions"
+    manager = SessionManager(sessions_dir=str(sessions_dir))
+    shutil.rmtree(sessions_dir, ignore_errors=True)
+
+    session = manager.create_session("s1", "demo", "model")
+    assert (sessions_dir / f"{session.session_id}.json").exists()
+    loaded = SessionManager(sessions_dir=str(sessions_dir))
+    assert session.session_id in loaded.sessions
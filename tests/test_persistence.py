@@ -0,0 +1,95 @@
+"""Tests for the deferred persistence helpers."""
+
+import json
+import os
+import threading
+
+import pytest
+
+from src.rlm import persistence
+from src.rlm.persistence import DeferredSave, read_json, write_json_atomic
+
+
+class _Store(DeferredSave):
+    def __init__(self, path):
+        self.path = path
+        self.items = []
+        self.writes = 0
+        self._init_deferred_save()
+
+    def add(self, item):
+        self.items.append(item)
+        self._save()
+
+    def _save_now(self):
+        self.writes += 1
+        write_json_atomic(self.path, list(self.items))
+
+
+def test_write_json_atomic_round_trip(tmp_path):
+    path = str(tmp_path / "data.json")
+    write_json_atomic(path, {"a": [1, 2, 3]})
+    assert read_json(path) == {"a": [1, 2, 3]}
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_read_json_missing_file(tmp_path):
+    assert read_json(str(tmp_path / "missing.json")) is None
+
+
+def test_zstd_replaces_plain_copy(tmp_path):
+    pytest.importorskip("zstandard")
+    path = str(tmp_path / "data.json")
+    with open(path, "w") as f:
+        json.dump({"old": True}, f)
+
+    write_json_atomic(path, {"new": True})
+    assert os.path.exists(path + ".zst")
+    assert not os.path.exists(path)
+    assert read_json(path) == {"new": True}
+
+
+def test_saves_within_interval_are_deferred(tmp_path):
+    store = _Store(str(tmp_path / "store.json"))
+    store.flush_interval = 3600.0
+    threads = threading.active_count()
+
+    store.add(1)
+    store.flush()
+    for item in range(2, 6):
+        store.add(item)
+        # Nothing is written in the background between mutations
+        assert store.writes == 1
+        assert read_json(store.path) == [1]
+    assert threading.active_count() == threads
+
+    store.flush()
+    assert store.writes == 2
+    assert read_json(store.path) == [1, 2, 3, 4, 5]
+
+    # A clean store does not write again
+    store.flush()
+    assert store.writes == 2
+
+
+def test_interleaved_mutations_and_flushes(tmp_path):
+    store = _Store(str(tmp_path / "store.json"))
+    store.flush_interval = 3600.0
+
+    for item in range(20):
+        store.add(item)
+        if item % 3 == 0:
+            store.flush()
+            assert read_json(store.path) == store.items
+    store.flush()
+    assert read_json(store.path) == list(range(20))
+
+
+def test_exit_hook_flushes_live_stores(tmp_path):
+    store = _Store(str(tmp_path / "store.json"))
+    store.flush_interval = 3600.0
+    store.add("a")
+    store.add("b")
+
+    persistence._flush_live_stores()
+    assert read_json(store.path) == ["a", "b"]
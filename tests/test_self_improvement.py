@@ -0,0 +1,72 @@
+"""Tests for SelfImprovementEngine's feedback log and snapshot."""
+
+import json
+import os
+
+from src.rlm.self_improvement import SelfImprovementEngine
+
+
+def _feedback(engine, i, rating=5):
+    engine.learn_from_feedback(f"question about topic{i}", "answer", "ok", rating)
+
+
+def test_round_trip(tmp_path):
+    engine = SelfImprovementEngine(storage_dir=str(tmp_path))
+    _feedback(engine, 1, rating=5)
+    _feedback(engine, 2, rating=1)
+    engine.flush()
+
+    loaded = SelfImprovementEngine(storage_dir=str(tmp_path))
+    assert [r["query"] for r in loaded.improvement_log] == [
+        "question about topic1",
+        "question about topic2",
+    ]
+    assert loaded.get_stats()["total_improvements"] == 2
+    assert loaded.success_patterns["topic1"] == 1
+    assert loaded.mistake_patterns["topic2"] == 1
+    assert loaded.quality_scores == [1.0, 0.2]
+
+
+class _SmallLogEngine(SelfImprovementEngine):
+    max_log_entries = 5
+
+
+def test_log_is_bounded_and_compacted(tmp_path):
+    engine = _SmallLogEngine(storage_dir=str(tmp_path))
+    for i in range(12):
+        _feedback(engine, i)
+
+    with open(engine.log_file) as f:
+        assert sum(1 for line in f if line.strip()) <= 10
+    engine.flush()
+
+    loaded = _SmallLogEngine(storage_dir=str(tmp_path))
+    assert len(loaded.improvement_log) == 5
+    assert loaded.get_stats()["total_improvements"] == 12
+    assert loaded.improvement_log[-1]["query"] == "question about topic11"
+
+
+def test_legacy_snapshot_log_is_migrated(tmp_path):
+    legacy_log = [
+        {"timestamp": "2024-01-01T00:00:00", "query": f"q{i}", "rating": 4}
+        for i in range(3)
+    ]
+    with open(os.path.join(tmp_path, "improvement.json"), "w") as f:
+        json.dump(
+            {
+                "improvement_log": legacy_log,
+                "mistake_patterns": {},
+                "success_patterns": {"q0": 1},
+                "quality_scores": [0.8, 0.8, 0.8],
+            },
+            f,
+        )
+
+    engine = SelfImprovementEngine(storage_dir=str(tmp_path))
+    engine.flush()
+    assert [r["query"] for r in engine.improvement_log] == ["q0", "q1", "q2"]
+    assert engine.get_stats()["total_improvements"] == 3
+
+    loaded = SelfImprovementEngine(storage_dir=str(tmp_path))
+    assert [r["query"] for r in loaded.improvement_log] == ["q0", "q1", "q2"]
+    assert loaded.success_patterns["q0"] == 1
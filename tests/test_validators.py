@@ -0,0 +1,28 @@
+"""Tests for the config validators."""
+
+from src.utils.validators import validate_agent_config, validate_llm_config
+
+
+def test_invalid_provider_lists_choices_in_order():
+    valid, errors = validate_llm_config({"provider": "nope", "model": "m"})
+    assert not valid
+    assert (
+        "Invalid provider. Must be one of: "
+        "['openai', 'anthropic', 'local', 'groq', 'cohere', 'mistral']"
+    ) in errors
+
+
+def test_unhashable_values_are_reported_not_raised():
+    _, errors = validate_llm_config({"provider": ["openai"], "model": "m"})
+    assert any(error.startswith("Invalid provider") for error in errors)
+
+    config = {
+        "name": "n",
+        "role": "r",
+        "goal": "g",
+        "backstory": "b",
+        "agent_type": {"manager": True},
+    }
+    valid, errors = validate_agent_config(config)
+    assert not valid
+    assert errors == ["Invalid agent_type. Must be one of: ['manager', 'specialist']"]
@@ -0,0 +1,147 @@
+"""Tests for VectorStore persistence and search."""
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+from src.rlm.vector_store import VectorStore
+
+from .conftest import DIMENSION
+
+
+def _store(cache_dir, **kwargs):
+    return VectorStore(dimension=DIMENSION, cache_dir=str(cache_dir), **kwargs)
+
+
+def test_add_after_save_copies_memory_map(tmp_path, stub_model):
+    store = _store(tmp_path)
+    store.add_many([("a", "apple pie", {}), ("b", "banana bread", {})])
+    store.flush()
+    # The saved matrix is searched through a read-only memory map
+    assert isinstance(store._matrix, np.memmap)
+    assert not store._matrix.flags.writeable
+
+    store.add_many([("c", "cherry tart", {})])
+    store.flush()
+    assert [entry.id for entry, _ in store.search("cherry tart", top_k=1)] == ["c"]
+    assert [entry.id for entry, _ in store.search("apple pie", top_k=1)] == ["a"]
+
+
+def test_round_trip(tmp_path, stub_model):
+    store = _store(tmp_path)
+    store.add_many(
+        [
+            ("a", "apple pie", {"kind": "dessert"}),
+            ("b", "banana bread", {"kind": "bread"}),
+        ]
+    )
+    store.flush()
+
+    loaded = _store(tmp_path)
+    assert list(loaded.entries) == ["a", "b"]
+    assert loaded.entries["b"].metadata == {"kind": "bread"}
+    np.testing.assert_allclose(
+        loaded._matrix, store._matrix[: len(store._ids)], atol=1e-6
+    )
+    results = loaded.search("banana", filter_metadata={"kind": "bread"})
+    assert [entry.id for entry, _ in results] == ["b"]
+
+
+def test_vectors_saved_as_npy_and_loaded_as_memory_map(tmp_path, stub_model):
+    store = _store(tmp_path)
+    store.add_many([("a", "apple pie", {}), ("b", "banana bread", {})])
+    store.flush()
+
+    saved = np.load(tmp_path / "vectors.npy")
+    assert saved.shape == (2, DIMENSION)
+    loaded = _store(tmp_path)
+    assert isinstance(loaded._matrix, np.memmap)
+    assert [entry.id for entry, _ in loaded.search("apple", top_k=1)] == ["a"]
+
+
+@pytest.mark.parametrize("precision", ["fp16", "int8"])
+def test_reduced_precision_round_trip(tmp_path, stub_model, precision):
+    store = _store(tmp_path, precision=precision)
+    store.add_many([("a", "apple pie", {}), ("b", "banana bread", {})])
+    store.flush()
+    assert np.load(tmp_path / "vectors.npy").dtype == store._matrix.dtype
+
+    loaded = _store(tmp_path, precision=precision)
+    results = loaded.search("banana bread", top_k=2, threshold=0.0)
+    assert results[0][0].id == "b"
+    assert results[0][1] == pytest.approx(1.0, abs=0.02)
+
+
+def test_matrix_converted_when_precision_changes(tmp_path, stub_model):
+    store = _store(tmp_path)
+    store.add_many([("a", "apple pie", {}), ("b", "banana bread", {})])
+    store.flush()
+
+    loaded = _store(tmp_path, precision="int8")
+    assert loaded._matrix.dtype == np.int8
+    assert [entry.id for entry, _ in loaded.search("apple pie", top_k=1)] == ["a"]
+
+
+def test_legacy_json_vectors_are_migrated(tmp_path, stub_model):
+    vectors = {"a": stub_model.encode("apple pie").tolist()}
+    metadata = {
+        "a": {
+            "text": "apple pie",
+            "metadata": {},
+            "created_at": "2024-01-01T00:00:00",
+            "access_count": 2,
+            "last_accessed": None,
+        }
+    }
+    with open(tmp_path / "vectors.json", "w") as f:
+        json.dump(vectors, f)
+    with open(tmp_path / "metadata.json", "w") as f:
+        json.dump(metadata, f)
+
+    store = _store(tmp_path)
+    assert store.entries["a"].access_count == 2
+    store._save()
+    store.flush()
+    assert os.path.exists(tmp_path / "vectors.npy")
+    assert not os.path.exists(tmp_path / "vectors.json")
+    assert [entry.id for entry, _ in _store(tmp_path).search("apple")] == ["a"]
+
+
+def _ann_store(cache_dir):
+    store = _store(cache_dir)
+    store.ann_threshold = 10
+    store.add_many([(f"w{i}", f"word{i} common", {"group": i % 5}) for i in range(40)])
+    return store
+
+
+def test_filtered_search_scans_every_matching_row(tmp_path, stub_model):
+    pytest.importorskip("hnswlib")
+    store = _ann_store(tmp_path)
+    results = store.search(
+        "word7", top_k=3, threshold=0.0, filter_metadata={"group": 2}
+    )
+    assert results
+    assert all(entry.metadata["group"] == 2 for entry, _ in results)
+    assert results[0][0].id == "w7"
+
+
+def test_ann_index_persists_and_stale_index_is_removed(tmp_path, stub_model):
+    pytest.importorskip("hnswlib")
+    store = _ann_store(tmp_path)
+    store.search("word3", top_k=1)
+    store.flush()
+    ann_file = tmp_path / "ann_index.bin"
+    assert ann_file.exists()
+
+    loaded = _store(tmp_path)
+    loaded.ann_threshold = 10
+    assert loaded._load_ann_index() is not None
+    assert [entry.id for entry, _ in loaded.search("word3", top_k=1)] == ["w3"]
+
+    # Changing vectors without an index in memory drops the saved index
+    stale = _store(tmp_path)
+    stale.add_many([("w3", "something else", {})])
+    stale.flush()
+    assert not ann_file.exists()